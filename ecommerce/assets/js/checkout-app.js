@@ -16,6 +16,7 @@ const app = createApp({
             cartItems: [],
             cartCount: 0,
             currentPage: 'checkout',
+            orderIdempotencyKey: null, // Kept across retries of the same order
             logoImage: '',
             isLoggedIn: false,
             userEmail: '',
@@ -229,30 +230,8 @@ const app = createApp({
                     const token = localStorage.getItem('shopvue_access_token');
                     if (this.isLoggedIn && token && this.cartItems.length > 0) {
                         try {
-                            // Get current backend cart
-                            const backendCart = await apiService.getCart();
-                            
-                            // Sync each item to backend
-                            for (const item of this.cartItems) {
-                                const backendItem = backendCart.find(bItem => bItem.product.id === item.id);
-                                if (backendItem) {
-                                    // Update quantity if different
-                                    if (backendItem.quantity !== item.quantity) {
-                                        await apiService.updateCartItem(backendItem.id, item.quantity);
-                                    }
-                                } else {
-                                    // Add new item to backend
-                                    await apiService.addToCart(item.id, item.quantity);
-                                }
-                            }
-                            
-                            // Remove items from backend that are not in localStorage
-                            for (const backendItem of backendCart) {
-                                const localItem = this.cartItems.find(item => item.id === backendItem.product.id);
-                                if (!localItem) {
-                                    await apiService.removeFromCart(backendItem.id);
-                                }
-                            }
+                            // Replace the backend cart with the local one in a single request
+                            await apiService.replaceCart(this.cartItems);
                         } catch (error) {
                             console.warn('Failed to sync cart to backend (user may not be logged in via Django):', error.message);
                             // Continue with localStorage cart - this is OK for guest users
@@ -404,62 +383,10 @@ const app = createApp({
                 // If user is logged in AND has valid token, sync cart to backend first
                 if (this.isLoggedIn && token) {
                     try {
-                        // Sync all cart items to backend
-                        let backendCart = [];
-                        try {
-                            backendCart = await apiService.getCart();
-                            console.log('Backend cart loaded:', backendCart);
-                        } catch (getCartError) {
-                            console.warn('Could not get backend cart, will create new items:', getCartError);
-                            // Continue - will add all items as new
-                            backendCart = [];
-                        }
-                        
-                        // Add/update items in backend
-                        for (const item of this.cartItems) {
-                            try {
-                                const backendItem = backendCart.find(bItem => {
-                                    const productId = bItem.product?.id || bItem.product;
-                                    return productId === item.id;
-                                });
-                                
-                                if (backendItem) {
-                                    // Update quantity if different
-                                    if (backendItem.quantity !== item.quantity) {
-                                        await apiService.updateCartItem(backendItem.id, item.quantity);
-                                        console.log(`Updated cart item ${item.id} to quantity ${item.quantity}`);
-                                    }
-                                } else {
-                                    // Add new item to backend
-                                    console.log(`Adding product ${item.id} (${item.name}) to backend cart with quantity ${item.quantity}`);
-                                    await apiService.addToCart(item.id, item.quantity);
-                                    console.log(`Added cart item ${item.id} with quantity ${item.quantity}`);
-                                }
-                            } catch (itemError) {
-                                console.error(`Error syncing cart item ${item.id}:`, itemError);
-                                // If it's a 404 or product not found, skip this item
-                                if (itemError.message && itemError.message.includes('404')) {
-                                    console.warn(`Product ${item.id} not found in backend, skipping`);
-                                    continue;
-                                }
-                                // For other errors, throw to stop the process
-                                throw itemError;
-                            }
-                        }
-                        
-                        // Remove items from backend that are not in localStorage
-                        for (const backendItem of backendCart) {
-                            try {
-                                const productId = backendItem.product?.id || backendItem.product;
-                                const localItem = this.cartItems.find(item => item.id === productId);
-                                if (!localItem) {
-                                    await apiService.removeFromCart(backendItem.id);
-                                    console.log(`Removed cart item ${backendItem.id} from backend`);
-                                }
-                            } catch (removeError) {
-                                console.error(`Error removing cart item ${backendItem.id}:`, removeError);
-                                // Continue with next item - don't fail the whole process
-                            }
+                        // Sync all cart items to backend in a single request
+                        const synced = await apiService.replaceCart(this.cartItems);
+                        if (synced.skipped && synced.skipped.length > 0) {
+                            console.warn('Products not found in backend, skipped:', synced.skipped);
                         }
                         
                         console.log('Cart synced to backend successfully');
@@ -522,7 +449,13 @@ const app = createApp({
                 let backendOrder = null;
                 if (this.isLoggedIn && token) {
                     try {
-                        backendOrder = await apiService.createOrder(orderData);
+                        if (!this.orderIdempotencyKey) {
+                            this.orderIdempotencyKey = (window.crypto && crypto.randomUUID)
+                                ? crypto.randomUUID()
+                                : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+                        }
+                        backendOrder = await apiService.createOrder(orderData, this.orderIdempotencyKey);
+                        this.orderIdempotencyKey = null;
                         console.log('Order created in backend:', backendOrder);
                     } catch (apiError) {
                         console.error('Backend API error:', apiError);
@@ -296,14 +296,9 @@ const app = createApp({
                 // Sync to backend if logged in
                 if (this.isLoggedIn) {
                     try {
-                        // Find cart item ID from backend
-                        const backendCart = await apiService.getCart();
-                        const backendItem = backendCart.find(item => item.product.id === product.id);
-                        if (backendItem) {
-                            await apiService.updateCartItem(backendItem.id, existingItem.quantity);
-                        } else {
-                            await apiService.addToCart(product.id, existingItem.quantity);
-                        }
+                        await apiService.batchCart([
+                            { op: 'set', product_id: product.id, quantity: existingItem.quantity }
+                        ]);
                     } catch (error) {
                         console.error('Failed to sync cart to backend:', error);
                         // Continue with localStorage
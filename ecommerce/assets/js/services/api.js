@@ -102,14 +102,9 @@ const apiService = {
      */
     async getProducts() {
         try {
-            // Add cache-busting timestamp to ensure fresh data
-            const timestamp = new Date().getTime();
-            const response = await fetch(`${API_BASE_URL}/products/?_t=${timestamp}`, {
-                cache: 'no-cache',
-                headers: {
-                    'Cache-Control': 'no-cache'
-                }
-            });
+            // The API sends ETag + Cache-Control: no-cache, so the browser
+            // revalidates and gets a cheap 304 when nothing changed
+            const response = await fetch(`${API_BASE_URL}/products/`);
             if (!response.ok) throw new Error('Failed to fetch products');
             const data = await response.json();
             const products = data.results ? data.results : data;
@@ -171,7 +166,8 @@ const apiService = {
             const response = await fetch(`${API_BASE_URL}/products/search/?q=${encodeURIComponent(query.trim())}`);
             if (!response.ok) throw new Error('Search failed');
             const data = await response.json();
-            return data.map(transformProduct);
+            const products = data.results ? data.results : data;
+            return products.map(transformProduct);
         } catch (error) {
             console.warn('API Error, using fallback search:', error);
             // Fallback to client-side search
@@ -442,15 +438,55 @@ const apiService = {
         }
     },
 
+    /**
+     * Apply several cart operations in one request
+     * @param {Array} operations - [{ op: 'add'|'set'|'remove'|'clear', product_id, quantity }]
+     * @returns {Promise<Object>} { items, total, count, skipped }
+     */
+    async batchCart(operations) {
+        try {
+            const response = await fetch(`${API_BASE_URL}/cart/batch/`, {
+                method: 'POST',
+                headers: {
+                    ...getAuthHeaders(),
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ operations })
+            });
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || data.detail || JSON.stringify(data));
+            }
+            return data;
+        } catch (error) {
+            console.error('Batch cart error:', error);
+            throw error;
+        }
+    },
+
+    /**
+     * Make the backend cart match the local cart in one round trip
+     * @param {Array} items - Local cart items ({ id, quantity })
+     */
+    async replaceCart(items) {
+        return this.batchCart([
+            { op: 'clear' },
+            ...items.map(item => ({ op: 'set', product_id: item.id, quantity: item.quantity }))
+        ]);
+    },
+
     /**
      * Create order
+     * @param {Object} orderData - Order payload
+     * @param {string} [idempotencyKey] - Reuse the same key when retrying so the order is created once
      */
-    async createOrder(orderData) {
+    async createOrder(orderData, idempotencyKey = null) {
         try {
             const response = await fetch(`${API_BASE_URL}/orders/create_order/`, {
                 method: 'POST',
                 headers: {
                     ...getAuthHeaders(),
+                    ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
                     'Content-Type': 'application/json'
                 },
                 body: JSON.stringify(orderData)
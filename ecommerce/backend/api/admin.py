@@ -2,7 +2,7 @@
 Django Admin Configuration
 """
 from django.contrib import admin
-from .models import Category, Product, Address, CartItem, Order, OrderItem
+from .models import Category, Product, Address, CartItem, Order, OrderItem, IdempotencyKey, SeedFingerprint
 
 
 @admin.register(Category)
@@ -77,3 +77,17 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'scope', 'status_code', 'created_at', 'expires_at']
+    list_filter = ['status_code', 'created_at']
+    search_fields = ['key', 'scope']
+    readonly_fields = ['scope', 'key', 'request_hash', 'status_code', 'response_body', 'created_at', 'expires_at']
+    list_per_page = 25
+
+
+@admin.register(SeedFingerprint)
+class SeedFingerprintAdmin(admin.ModelAdmin):
+    list_display = ['step', 'fingerprint', 'applied_at']
+    readonly_fields = ['step', 'fingerprint', 'applied_at']
@@ -6,3 +6,5 @@ class ApiConfig(AppConfig):
     name = 'api'
     verbose_name = 'Ecommerce API'
 
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,255 @@
+"""
+Async views for the read-heavy GET routes, served under ASGI
+
+With settings.ASYNC_VIEWS on (shopvue/asgi.py sets it) urls.py routes product
+list/detail/search/suggest, categories and /auth/user/ here ahead of the viewsets.
+Each view borrows its viewset's queryset, filter backends and paginator, and
+uses the same catalog cache keys and ETags, so responses match the sync views;
+the difference is that rows are fetched with the async ORM, leaving the
+worker free to serve other connections while a query or a client is slow.
+Responses are JSON, or MessagePack when it is enabled and the client asks for
+it (there is no browsable API on these routes).
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework import exceptions
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from .cache import cache_key, get_cache, record
+from .conditional import catalog_validators, make_etag, set_validators
+from .facets import facet_counts, wants_facets
+from .fieldsets import field_plan
+from .models import Product
+from .search import get_search_backend
+from .serializers import CatalogRowSerializer, UserSerializer
+from .suggest import parse_limit, suggest, suggestion_response, suggestions
+from .views import CategoryViewSet, ProductViewSet
+
+ALLOWED_METHODS = ('GET', 'HEAD')
+renderers = [
+    renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    if not issubclass(renderer, BrowsableAPIRenderer)
+]
+
+
+def negotiate(request):
+    """Pick the renderer for the request's Accept header; JSON when nothing matches"""
+    try:
+        renderer, media_type = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS().select_renderer(request, renderers)
+    except exceptions.NotAcceptable:
+        renderer, media_type = renderers[0], renderers[0].media_type
+    request.accepted_renderer, request.accepted_media_type = renderer, media_type
+
+
+def render(request, data, status=200):
+    renderer = request.accepted_renderer
+    content = renderer.render(data, request.accepted_media_type, {'request': request})
+    response = HttpResponse(content, status=status, content_type=renderer.media_type)
+    if len(renderers) > 1:
+        patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def get_authenticators():
+    return [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+
+def async_api_view(login_required=False, replica_reads=False):
+    """
+    Wrap an async view the way APIView would: GET/HEAD only, REST framework
+    error bodies, and a DRF Request. Credentials are checked (in a worker
+    thread, as they may need a query) when the view requires a user, for
+    other methods, or when the client sent an Authorization header, which the
+    sync views would reject if invalid.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request = Request(request, authenticators=get_authenticators())
+            negotiate(request)
+            safe = request.method in ALLOWED_METHODS
+            try:
+                if login_required or not safe or 'HTTP_AUTHORIZATION' in request.META:
+                    user = await sync_to_async(lambda: request.user)()
+                    # Permissions come before the method check, as in APIView
+                    if (login_required or not safe) and not user.is_authenticated:
+                        raise exceptions.NotAuthenticated()
+                if not safe:
+                    raise exceptions.MethodNotAllowed(request.method)
+                return await view(request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                    exc.auth_header = request.authenticators[0].authenticate_header(request)
+                error = exception_handler(exc, {'request': request})
+                response = render(request, error.data, status=error.status_code)
+                if 'WWW-Authenticate' in error:
+                    response['WWW-Authenticate'] = error['WWW-Authenticate']
+                if isinstance(exc, exceptions.MethodNotAllowed):
+                    response['Allow'] = ', '.join(ALLOWED_METHODS)
+                return response
+        wrapper.csrf_exempt = True
+        wrapper.replica_reads = replica_reads
+        return wrapper
+    return decorator
+
+
+def get_viewset(viewset_class, request, action, **kwargs):
+    """A viewset instance used for its queryset, filters and paginator only"""
+    return viewset_class(request=request, args=(), kwargs=kwargs, format_kwarg=None, action=action)
+
+
+@sync_to_async(thread_sensitive=False)
+def lookup_catalog(request, view_name):
+    """ETag, Last-Modified and the cached payload, if any (the cache may be on disk)"""
+    seed, last_modified = catalog_validators()
+    key = cache_key(request, view_name) if view_name else None
+    return make_etag(request, seed), last_modified, key, get_cache().get(key) if key else None
+
+
+@sync_to_async(thread_sensitive=False)
+def store_catalog(key, data):
+    get_cache().set(key, data)
+
+
+async def catalog_response(request, view_name, build):
+    """
+    conditional_get and cache_catalog_response for async views: 304 while the
+    client's validators match, else the cached payload, else `await build()`.
+    view_name=None skips the cache, as for search.
+    """
+    etag, last_modified, key, data = await lookup_catalog(request, view_name)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None and key is None:
+        response = render(request, await build())
+    elif response is None and data is not None:
+        record('hits')
+        response = render(request, data)
+        response['X-Cache'] = 'HIT'
+    elif response is None:
+        record('misses')
+        data = await build()
+        await store_catalog(key, data)
+        response = render(request, data)
+        response['X-Cache'] = 'MISS'
+    set_validators(response, etag, last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+async def paginated(view, request, queryset, serialize):
+    page = await view.paginator.apaginate_queryset(queryset, request, view)
+    if page is None:
+        return serialize([row async for row in queryset])
+    return view.paginator.get_paginated_response(serialize(page)).data
+
+
+async def get_row(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404
+
+
+@async_api_view(replica_reads=True)
+async def product_list(request):
+    view = get_viewset(ProductViewSet, request, 'list')
+
+    async def build():
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        columns = serializer.product_columns(*view.ordering_fields)
+        queryset = view.filter_queryset(view.get_queryset()).values(*columns)
+        data = await paginated(view, request, queryset, serializer.products)
+        if isinstance(data, dict) and wants_facets(request):
+            data['facets'] = await sync_to_async(facet_counts)(request)
+        return data
+    return await catalog_response(request, 'product-list', build)
+
+
+@async_api_view(replica_reads=True)
+async def product_detail(request, slug):
+    view = get_viewset(ProductViewSet, request, 'retrieve', slug=slug)
+
+    async def build():
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        queryset = view.filter_queryset(view.get_queryset()).values(*serializer.product_columns())
+        return serializer.product(await get_row(queryset, slug=slug))
+    return await catalog_response(request, 'product-retrieve', build)
+
+
+@async_api_view(replica_reads=True)
+async def product_search(request):
+    view = get_viewset(ProductViewSet, request, 'search')
+
+    async def build():
+        params = request.query_params
+        scope = view.get_queryset() if params.get('category') else None
+        results = get_search_backend().results(params.get('q', ''), scope)
+        page = await view.paginator.apaginate_queryset(results, request, view)
+        product_ids = page if page is not None else await sync_to_async(results.__getitem__)(slice(None))
+
+        # Hydrate the ranked page in one query and restore the ranking order
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        rows = view.get_queryset().filter(pk__in=product_ids).values(*serializer.product_columns())
+        by_id = {row['id']: row async for row in rows}
+        data = serializer.products(by_id[pk] for pk in product_ids if pk in by_id)
+        if page is not None:
+            return view.paginator.get_paginated_response(data).data
+        return data
+    return await catalog_response(request, None, build)
+
+
+@async_api_view(replica_reads=True)
+async def product_suggest(request):
+    index = suggestions.fresh()
+    if index is None:
+        # Building or catching up the index needs the database and the catalog cache
+        index = await sync_to_async(suggestions.get)()
+    params = request.query_params
+    return suggestion_response(render(request, suggest(params.get('q', ''), parse_limit(params.get('limit')), index)))
+
+
+@async_api_view(replica_reads=True)
+async def category_list(request):
+    view = get_viewset(CategoryViewSet, request, 'list')
+
+    async def build():
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        queryset = view.filter_queryset(view.get_queryset()).values(*serializer.category_columns())
+        return await paginated(view, request, queryset, serializer.category_list)
+    return await catalog_response(request, 'category-list', build)
+
+
+@async_api_view(replica_reads=True)
+async def category_detail(request, slug):
+    view = get_viewset(CategoryViewSet, request, 'retrieve', slug=slug)
+
+    async def build():
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        queryset = view.filter_queryset(view.get_queryset()).values(*serializer.category_columns())
+        return serializer.category(await get_row(queryset, slug=slug))
+    return await catalog_response(request, 'category-retrieve', build)
+
+
+@async_api_view(replica_reads=True)
+async def category_products(request, slug):
+    view = get_viewset(CategoryViewSet, request, 'products', slug=slug)
+
+    async def build():
+        category = await get_row(view.filter_queryset(view.get_queryset()).values('pk'), slug=slug)
+        # No request here, matching CategoryViewSet.products
+        serializer = CatalogRowSerializer(plan=field_plan(request))
+        rows = Product.objects.filter(category_id=category['pk'], is_active=True).values(*serializer.product_columns())
+        return serializer.products([row async for row in rows])
+    return await catalog_response(request, 'category-products', build)
+
+
+@async_api_view(login_required=True)
+async def get_user(request):
+    """Current user; the profile comes from the per-process cache the token's fingerprint check fills"""
+    return render(request, UserSerializer(request.user).data)
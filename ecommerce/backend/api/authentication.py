@@ -0,0 +1,107 @@
+"""
+JWT authentication without a per-request user query
+
+Tokens issued by ClaimsRefreshToken carry the user's profile fields (for
+clients) plus an `auth` fingerprint of the user's password hash and active/staff
+flags. ClaimsJWTAuthentication re-checks the fingerprint against the database
+at most once per JWT_USER_CACHE_TTL seconds per process, reading the current
+profile fields in the same query, and builds the User from those rather than
+loading it on every request. Any User save in this process drops the cached
+row. A password change, deactivation or privilege change therefore locks out
+old tokens within the TTL, and a profile edit shows up within it. Tokens
+without these claims (issued before this change) go through the regular
+database lookup.
+
+The User built this way is not a full row (it has no password), so saving
+it raises; load the user from the database to change it.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.crypto import salted_hmac
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+PROFILE_CLAIMS = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser')
+FINGERPRINT_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+FINGERPRINT_CLAIM = 'auth'
+# Bounds the per-process cache; it is simply emptied when full
+MAX_CACHED_USERS = 10000
+
+_verified_lock = threading.Lock()
+_verified = {}  # user id -> (fingerprint, profile, expires at)
+
+
+def auth_fingerprint(user):
+    """Changes whenever the password, active flag or admin flags change"""
+    value = f'{user.password}|{user.is_active}|{user.is_staff}|{user.is_superuser}'
+    return salted_hmac('api.authentication.auth_fingerprint', value).hexdigest()[:32]
+
+
+def refuse_save(*args, **kwargs):
+    raise RuntimeError('This User was built from token claims; load it from the database to save it')
+
+
+def forget_user(user_id):
+    with _verified_lock:
+        _verified.pop(user_id, None)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token (and derived access tokens) carrying user profile claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in PROFILE_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[FINGERPRINT_CLAIM] = auth_fingerprint(user)
+        return token
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that checks the fingerprint claim against a per-process cache of users"""
+
+    def get_user(self, validated_token):
+        if FINGERPRINT_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        profile = self.current_profile(user_id, validated_token[FINGERPRINT_CLAIM])
+        if profile is None:
+            raise AuthenticationFailed('Token is no longer valid for this user', code='user_changed')
+
+        user = User(id=user_id, is_active=True, **profile)
+        # Behave like a row loaded from the database (e.g. for FK assignment)
+        user._state.adding = False
+        user._state.db = 'default'
+        # ...except that saving it would blank the real row's password
+        user.save = refuse_save
+        return user
+
+    def current_profile(self, user_id, fingerprint):
+        """The user's profile fields, or None when `fingerprint` is no longer current"""
+        ttl = getattr(settings, 'JWT_USER_CACHE_TTL', 30)
+        now = time.monotonic()
+        with _verified_lock:
+            cached = _verified.get(user_id)
+        if cached is not None and cached[2] > now:
+            return cached[1] if cached[0] == fingerprint else None
+
+        user = User.objects.filter(pk=user_id).only(*FINGERPRINT_FIELDS, *PROFILE_CLAIMS).first()
+        if user is None or not user.is_active:
+            forget_user(user_id)
+            return None
+
+        current = auth_fingerprint(user)
+        profile = {field: getattr(user, field) for field in PROFILE_CLAIMS}
+        if ttl:
+            with _verified_lock:
+                if len(_verified) >= MAX_CACHED_USERS:
+                    _verified.clear()
+                _verified[user_id] = (current, profile, now + ttl)
+        return profile if current == fingerprint else None
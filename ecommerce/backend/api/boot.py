@@ -0,0 +1,104 @@
+"""
+Cold-start helpers for the boot command
+
+Each check is cheap when there is nothing to do. Pending migrations are found
+by comparing migration file names with the django_migrations table, without
+importing any migration module or building the graph. Seed commands are
+fingerprinted by their source, so they only run again after they change.
+"""
+import hashlib
+import importlib.util
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import get_commands
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+from .models import SeedFingerprint
+
+# Run in this order on boot; each command must be safe to re-run
+SEED_COMMANDS = ('create_sample_data', 'create_default_admin')
+
+# What a server process imports before it can answer a request
+STARTUP_IMPORTS = (
+    'import django; django.setup()\n'
+    'from django.core.wsgi import get_wsgi_application; get_wsgi_application()\n'
+    'from django.urls import get_resolver; get_resolver().url_patterns\n'
+)
+
+
+def migration_files():
+    """(app label, migration name) for every migration file on disk"""
+    found = set()
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        try:
+            spec = importlib.util.find_spec(module_name) if module_name else None
+        except ModuleNotFoundError:
+            spec = None
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for directory in spec.submodule_search_locations:
+            for entry in os.scandir(directory):
+                name, extension = os.path.splitext(entry.name)
+                # The same filter MigrationLoader applies
+                if extension == '.py' and not name.startswith(('_', '~')):
+                    found.add((app_config.label, name))
+    return found
+
+
+def pending_migrations(using=DEFAULT_DB_ALIAS):
+    """
+    Migration files not recorded as applied. A squashed migration whose
+    originals were applied one by one is reported until migrate records it,
+    which only costs one unnecessary migrate run.
+    """
+    applied = MigrationRecorder(connections[using]).applied_migrations()
+    return sorted(migration_files() - set(applied))
+
+
+def command_fingerprint(command_name):
+    """sha256 of a management command's source; its seed data lives there"""
+    module = f'{get_commands()[command_name]}.management.commands.{command_name}'
+    return hashlib.sha256(Path(importlib.util.find_spec(module).origin).read_bytes()).hexdigest()
+
+
+def seed_is_current(command_name, fingerprint):
+    return SeedFingerprint.objects.filter(step=command_name, fingerprint=fingerprint).exists()
+
+
+def record_seed(command_name, fingerprint):
+    SeedFingerprint.objects.update_or_create(step=command_name, defaults={'fingerprint': fingerprint})
+
+
+def profile_imports():
+    """
+    Import the app in a fresh interpreter under -X importtime. Returns the
+    total import time in ms and the top-level imports as (cumulative ms, module),
+    slowest first.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_IMPORTS],
+        cwd=settings.BASE_DIR, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr[-2000:])
+
+    total_us, top_level = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # column header
+        total_us += int(self_us)
+        # Nested imports are indented two spaces per level
+        if not module.startswith('  '):
+            top_level.append((int(cumulative_us) / 1000, module.strip()))
+    return total_us / 1000, sorted(top_level, reverse=True)
@@ -0,0 +1,108 @@
+"""
+Catalog response cache
+
+Read-only catalog responses are cached under a key built from the full request
+URL and a catalog version number. Any Product or Category save/delete bumps the
+version (see signals.py), which makes every older entry unreachable at once;
+stale entries then age out through the cache's TIMEOUT and MAX_ENTRIES limits.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+CACHE_ALIAS = 'catalog'
+VERSION_KEY = 'catalog:version'
+MODIFIED_KEY = 'catalog:modified'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_catalog_version():
+    version = get_cache().get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a culled version key is never reissued
+        version = time.time_ns() // 1000
+        if not get_cache().add(VERSION_KEY, version, timeout=None):
+            version = get_cache().get(VERSION_KEY, version)
+    return version
+
+
+def get_catalog_last_modified():
+    """Unix time of the last catalog write, or None when unknown"""
+    return get_cache().get(MODIFIED_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate all cached catalog responses"""
+    cache = get_cache()
+    cache.set(MODIFIED_KEY, int(time.time()), timeout=None)
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        return get_catalog_version()
+
+
+def bump_catalog_version_on_commit():
+    # Bumping before commit would let a concurrent request re-cache old rows
+    transaction.on_commit(bump_catalog_version)
+
+
+def record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'version': get_catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def cache_key(request, view_name):
+    params = sorted(request.query_params.lists())
+    query = urlencode([(key, value) for key, values in params for value in values])
+    # The host is part of the key because serializers emit absolute media URLs
+    raw = f'{request.get_host()}{request.path}?{query}'
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f'catalog:{get_catalog_version()}:{view_name}:{digest}'
+
+
+def cache_catalog_response(view_method):
+    """Cache successful GET responses of a viewset method"""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return view_method(self, request, *args, **kwargs)
+
+        key = cache_key(request, f'{self.basename}-{view_method.__name__}')
+        cached = get_cache().get(key)
+        if cached is not None:
+            record('hits')
+            response = Response(cached)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            get_cache().set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
@@ -0,0 +1,67 @@
+"""
+Batch cart mutations
+"""
+from django.db import transaction
+
+from .models import CartItem, Product
+
+
+def apply_cart_operations(user, operations):
+    """
+    Apply add/set/remove/clear operations to the user's cart atomically.
+
+    Operations are folded into the final {product_id: quantity} state in
+    memory, then written with one DELETE and one upsert on the
+    (user, product) unique key. Products that are unknown or inactive are
+    skipped and returned so the client can drop them locally.
+    """
+    wanted = {op['product_id'] for op in operations if op['op'] in ('add', 'set')}
+
+    with transaction.atomic():
+        available = set(
+            Product.objects.filter(pk__in=wanted, is_active=True).values_list('pk', flat=True)
+        )
+        existing = dict(
+            CartItem.objects.select_for_update(of=('self',))
+            .filter(user=user)
+            .values_list('product_id', 'quantity')
+        )
+
+        cart = dict(existing)
+        skipped = []
+        for op in operations:
+            kind = op['op']
+            if kind == 'clear':
+                cart.clear()
+                continue
+
+            product_id = op['product_id']
+            if kind == 'remove':
+                cart.pop(product_id, None)
+            elif product_id not in available:
+                if product_id not in skipped:
+                    skipped.append(product_id)
+            elif kind == 'add':
+                cart[product_id] = cart.get(product_id, 0) + op['quantity']
+            elif op['quantity'] > 0:
+                cart[product_id] = op['quantity']
+            else:
+                cart.pop(product_id, None)
+
+        removed = [product_id for product_id in existing if product_id not in cart]
+        if removed:
+            CartItem.objects.filter(user=user, product_id__in=removed).delete()
+
+        changed = [
+            CartItem(user=user, product_id=product_id, quantity=quantity)
+            for product_id, quantity in cart.items()
+            if existing.get(product_id) != quantity
+        ]
+        if changed:
+            CartItem.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['user', 'product'],
+                update_fields=['quantity', 'updated_at']
+            )
+    return skipped
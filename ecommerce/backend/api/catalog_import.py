@@ -0,0 +1,310 @@
+"""
+Streaming product feed import
+
+A feed is CSV (with a header row) or JSON Lines, optionally gzipped, with one
+product per row matched by `slug`. Only the columns a row carries are
+imported, so a feed of just `slug,image_url` updates images and nothing else.
+
+Rows are read and applied one chunk at a time, so memory does not grow with
+the feed. Each chunk loads its existing products in one query and compares
+every row's normalized values with the same fields of the stored product;
+unchanged rows are skipped without a write. The rest go out through
+bulk_create and bulk_update in one transaction per chunk, after which their
+search index entries are refreshed in one batch.
+"""
+import csv
+import gzip
+import json
+import re
+import sys
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .exports import strip_csv_guard
+from .models import Category, Product
+from .search import get_search_backend
+
+CENT = Decimal('0.01')
+REQUIRED_FOR_INSERT = ('name', 'price')
+SEARCH_FIELDS = {'name', 'description', 'is_active'}
+MAX_REPORTED_ERRORS = 20
+# IntegerField's range on every backend Django supports
+MAX_INTEGER = 2 ** 31 - 1
+SLUG_RE = re.compile(r'[-a-zA-Z0-9_]+')
+
+
+class FeedError(ValueError):
+    """A row that cannot be imported; the rest of the feed continues"""
+
+
+def text(value):
+    return '' if value is None else str(value)
+
+
+def required_text(max_length):
+    def convert(value):
+        value = text(value)
+        if not value.strip():
+            raise FeedError('must not be empty')
+        if len(value) > max_length:
+            raise FeedError(f'is longer than {max_length} characters')
+        return value
+    return convert
+
+
+def optional_text(value):
+    return str(value) if value not in (None, '') else None
+
+
+def decimal_between(low, high):
+    def convert(value):
+        try:
+            number = Decimal(str(value).strip()).quantize(CENT)
+        except (InvalidOperation, ValueError):
+            raise FeedError(f'{value!r} is not a number')
+        if not number.is_finite():
+            raise FeedError(f'{value!r} is not a number')
+        if number < low or (high is not None and number > high):
+            raise FeedError(f'{number} is outside {low}..{high if high is not None else "∞"}')
+        return number
+    return convert
+
+
+def optional(convert):
+    return lambda value: None if value in (None, '') else convert(value)
+
+
+def integer_between(low, high=None):
+    def convert(value):
+        try:
+            number = int(str(value).strip())
+        except ValueError:
+            raise FeedError(f'{value!r} is not an integer')
+        if number < low or (high is not None and number > high):
+            raise FeedError(f'{number} is outside {low}..{high if high is not None else "∞"}')
+        return number
+    return convert
+
+
+def boolean(value):
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in ('1', 'true', 'yes', 'y'):
+        return True
+    if normalized in ('0', 'false', 'no', 'n', ''):
+        return False
+    raise FeedError(f'{value!r} is not a boolean')
+
+
+def decimal_limit(name):
+    """The largest value the Product DecimalField `name` can store"""
+    field = Product._meta.get_field(name)
+    return Decimal(10) ** (field.max_digits - field.decimal_places) - Decimal(10) ** -field.decimal_places
+
+
+# Feed column -> (Product attribute, normalizer). Normalized values have the
+# types and precision the database returns, so they compare with stored rows.
+COLUMNS = {
+    'name': ('name', required_text(Product._meta.get_field('name').max_length)),
+    'description': ('description', text),
+    'price': ('price', decimal_between(0, decimal_limit('price'))),
+    'original_price': ('original_price', optional(decimal_between(0, decimal_limit('original_price')))),
+    'discount': ('discount', integer_between(0, 100)),
+    'stock': ('stock', integer_between(0, MAX_INTEGER)),
+    'rating': ('rating', decimal_between(0, 5)),
+    'reviews_count': ('reviews_count', integer_between(0, MAX_INTEGER)),
+    'is_active': ('is_active', boolean),
+    'image_url': ('image_url', optional_text),
+    'category': ('category_id', None),  # slug in the feed, resolved per chunk
+}
+STORED_FIELDS = [attribute for attribute, _ in COLUMNS.values()]
+
+
+def open_feed(path):
+    if path == '-':
+        return sys.stdin
+    opener = gzip.open if path.endswith('.gz') else open
+    return opener(path, 'rt', encoding='utf-8', newline='')
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise FeedError(f'Cannot tell the format of {path}; pass --format')
+
+
+def read_rows(handle, feed_format):
+    """Yield (line number, row dict) without reading the whole feed"""
+    if feed_format == 'csv':
+        reader = csv.DictReader(handle)
+        for row in reader:
+            # Cells of our own CSV exports may carry a spreadsheet formula guard
+            yield reader.line_num, {
+                column: strip_csv_guard(value) if isinstance(value, str) else value
+                for column, value in row.items()
+            }
+        return
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield line_number, FeedError(f'invalid JSON: {error.msg}')
+            continue
+        yield line_number, row if isinstance(row, dict) else FeedError('a JSON object per line is required')
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = self.inserted = self.updated = self.unchanged = self.invalid = 0
+        self.categories_created = 0
+        self.errors = []
+        self.ignored_columns = set()
+
+    def error(self, line_number, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'line {line_number}: {message}')
+
+
+class CatalogImporter:
+    def __init__(self, chunk_size=1000, create_categories=False, dry_run=False):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.dry_run = dry_run
+        self.categories = {}  # slug -> id, filled as feeds mention categories
+        self.search = get_search_backend()
+        self.stats = ImportStats()
+        self.created_categories = set()
+
+    def run(self, rows, on_chunk=None):
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.chunk_size)):
+            self.apply_chunk(chunk)
+            if on_chunk:
+                on_chunk(self.stats)
+        if (self.stats.inserted or self.stats.updated) and not self.dry_run:
+            bump_catalog_version()
+        return self.stats
+
+    def normalize(self, row):
+        """Return (slug, {attribute: value}) for the columns the row carries"""
+        slug = str(row.get('slug') or '').strip()
+        if not SLUG_RE.fullmatch(slug):
+            raise FeedError(f'invalid slug {slug!r}')
+        if len(slug) > Product._meta.get_field('slug').max_length:
+            raise FeedError(f'slug {slug[:20]!r}... is too long')
+
+        values = {}
+        for column, raw in row.items():
+            if column == 'slug':
+                continue
+            if column not in COLUMNS:
+                self.stats.ignored_columns.add(column)
+                continue
+            attribute, convert = COLUMNS[column]
+            try:
+                values[attribute] = raw if convert is None else convert(raw)
+            except FeedError as error:
+                raise FeedError(f'{column}: {error}')
+        return slug, values
+
+    def resolve_categories(self, incoming):
+        """Replace category slugs with ids; return the slugs created for this chunk"""
+        created_slugs = set()
+        wanted = {values['category_id'] for _, values in incoming.values() if values.get('category_id')}
+        missing = wanted - self.categories.keys()
+        if missing:
+            self.categories.update(Category.objects.filter(slug__in=missing).values_list('slug', 'id'))
+            missing -= self.categories.keys()
+        if missing and self.create_categories:
+            created = Category.objects.bulk_create([
+                Category(slug=slug, name=slug.replace('-', ' ').title()) for slug in sorted(missing)
+            ])
+            self.categories.update((category.slug, category.pk) for category in created)
+            self.created_categories.update(missing)
+            created_slugs = set(missing)
+            self.stats.categories_created = len(self.created_categories)
+            missing.clear()
+
+        for slug, (line_number, values) in list(incoming.items()):
+            category_slug = values.get('category_id')
+            if category_slug is None:
+                continue
+            if category_slug in missing:
+                self.stats.error(line_number, f'unknown category {category_slug!r}')
+                del incoming[slug]
+            else:
+                values['category_id'] = self.categories.get(category_slug) if category_slug else None
+        return created_slugs
+
+    def apply_chunk(self, chunk):
+        stats = self.stats
+        incoming = {}  # slug -> (line number, values); a later duplicate wins
+        for line_number, row in chunk:
+            stats.rows += 1
+            try:
+                if isinstance(row, FeedError):
+                    raise row
+                slug, values = self.normalize(row)
+            except FeedError as error:
+                stats.error(line_number, error)
+                continue
+            incoming[slug] = (line_number, values)
+
+        with transaction.atomic():
+            created_categories = self.resolve_categories(incoming)
+            existing = {
+                row['slug']: row
+                for row in Product.objects.filter(slug__in=list(incoming)).values('pk', 'slug', *STORED_FIELDS)
+            }
+
+            now = timezone.now()
+            to_create, to_update, update_fields = [], [], set()
+            for slug, (line_number, values) in incoming.items():
+                current = existing.get(slug)
+                if current is None:
+                    absent = [field for field in REQUIRED_FOR_INSERT if field not in values]
+                    if absent:
+                        stats.error(line_number, f'new product {slug!r} needs {", ".join(absent)}')
+                        continue
+                    to_create.append(Product(slug=slug, **values))
+                    continue
+
+                changed = [attribute for attribute, value in values.items() if current[attribute] != value]
+                if not changed:
+                    stats.unchanged += 1
+                    continue
+                product = Product(**{field: current[field] for field in ('pk', 'slug', *STORED_FIELDS)})
+                for attribute, value in values.items():
+                    setattr(product, attribute, value)
+                product.updated_at = now
+                to_update.append(product)
+                update_fields.update(changed)
+
+            if to_create:
+                Product.objects.bulk_create(to_create)
+            if to_update:
+                Product.objects.bulk_update(to_update, [*sorted(update_fields), 'updated_at'])
+            # bulk writes send no signals, so refresh the search index here
+            self.search.index_many(to_create + [
+                product for product in to_update if SEARCH_FIELDS & update_fields
+            ])
+            stats.inserted += len(to_create)
+            stats.updated += len(to_update)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+                # Their ids were rolled back; the next chunk creates them again
+                for slug in created_categories:
+                    self.categories.pop(slug, None)
+
@@ -0,0 +1,109 @@
+"""
+Checkout: turn a user's cart into an order in one transaction
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_catalog_version_on_commit
+from .models import CartItem, Order, OrderItem, Product
+
+# Products per guarded stock UPDATE; keeps SQLite under its bound-variable limit
+STOCK_BATCH_SIZE = 250
+
+
+class CheckoutError(Exception):
+    """Checkout could not be completed; nothing was written"""
+    status_message = 'Checkout failed'
+
+    def __init__(self, message=None, products=None):
+        super().__init__(message or self.status_message)
+        self.products = products or []
+
+
+class EmptyCart(CheckoutError):
+    status_message = 'Cart is empty'
+
+
+class OutOfStock(CheckoutError):
+    status_message = 'Some products are out of stock'
+
+
+def reserve_stock(quantities):
+    """
+    Decrement stock for {product_id: quantity} with guarded UPDATEs.
+
+    Products are batched by requested quantity, so each batch is a single
+    `stock = stock - n WHERE stock >= n` statement. If a batch updates fewer
+    rows than it names, some product ran out and the caller's transaction is
+    rolled back.
+    """
+    by_quantity = defaultdict(list)
+    for pk, quantity in quantities.items():
+        by_quantity[quantity].append(pk)
+
+    for quantity, product_ids in by_quantity.items():
+        for start in range(0, len(product_ids), STOCK_BATCH_SIZE):
+            batch = product_ids[start:start + STOCK_BATCH_SIZE]
+            # updated_at lets in-memory snapshots in other workers pick up the stock change
+            updated = Product.objects.filter(pk__in=batch, stock__gte=quantity).update(
+                stock=F('stock') - quantity, updated_at=timezone.now()
+            )
+            if updated != len(batch):
+                # Earlier batches are already decremented, so report from this one only
+                short = Product.objects.filter(pk__in=batch).values_list('pk', 'name', 'stock')
+                raise OutOfStock(products=[
+                    {'id': pk, 'name': name, 'stock': stock, 'requested': quantities[pk]}
+                    for pk, name, stock in short if stock < quantities[pk]
+                ])
+
+
+def place_order(user, delivery_address_id=None, shipping_cost=0, discount=0,
+                payment_method='', notes=''):
+    """Create an order from the user's cart, reserve stock and clear the cart"""
+    shipping_cost = Decimal(shipping_cost)
+    discount = Decimal(discount)
+
+    with transaction.atomic():
+        cart_items = list(
+            CartItem.objects.select_for_update(of=('self',))
+            .filter(user=user)
+            .select_related('product')
+        )
+        if not cart_items:
+            raise EmptyCart()
+
+        subtotal = sum(item.product.price * item.quantity for item in cart_items)
+        order = Order.objects.create(
+            user=user,
+            delivery_address_id=delivery_address_id,
+            subtotal=subtotal,
+            shipping_cost=shipping_cost,
+            discount=discount,
+            total=subtotal + shipping_cost - discount,
+            payment_method=payment_method,
+            notes=notes
+        )
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                product_name=item.product.name,
+                quantity=item.quantity,
+                price=item.product.price,
+                total=item.product.price * item.quantity
+            )
+            for item in cart_items
+        ])
+
+        reserve_stock({item.product_id: item.quantity for item in cart_items})
+        # Stock is part of the cached catalog payload and its ETags, and update()
+        # sends no signals, so every checkout invalidates them here
+        bump_catalog_version_on_commit()
+
+        CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+    return order
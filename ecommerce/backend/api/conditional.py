@@ -0,0 +1,132 @@
+"""
+Conditional GET support (ETag / Last-Modified)
+
+Viewsets provide `get_validators(request, **kwargs)` returning an ETag seed and
+an optional Last-Modified timestamp. Both come from cheap sources (the catalog
+version, or one aggregate over `updated_at`), so a matching If-None-Match is
+answered with 304 before any rows are fetched or serialized.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_catalog_last_modified, get_catalog_version
+
+
+def make_etag(request, seed):
+    # The full path is part of the tag: every page/filter is its own representation
+    raw = f'{seed}|{request.get_full_path()}'
+    # ...and so is every format but plain JSON (MessagePack, the browsable API)
+    renderer = getattr(request, 'accepted_renderer', None)
+    if renderer is not None and renderer.format != 'json':
+        raw += f'|{renderer.format}'
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def timestamp(value):
+    return int(value.timestamp()) if value is not None else None
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+
+def catalog_validators():
+    return f'catalog-{get_catalog_version()}', get_catalog_last_modified()
+
+
+def conditional_get(view_method):
+    """Answer GET/HEAD with 304 when the client's validators still match"""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_method(self, request, *args, **kwargs)
+
+        seed, last_modified = self.get_validators(request, **kwargs)
+        if seed is None:
+            # Unknown object: let the view produce its usual 404
+            return view_method(self, request, *args, **kwargs)
+
+        etag = make_etag(request, seed)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        set_validators(response, etag, last_modified)
+        self.patch_conditional_headers(response)
+        return response
+    return wrapper
+
+
+class CatalogValidatorsMixin:
+    """Catalog responses change only when the catalog version is bumped"""
+
+    def get_validators(self, request, **kwargs):
+        return catalog_validators()
+
+    def patch_conditional_headers(self, response):
+        # Cacheable, but clients must revalidate every time
+        patch_cache_control(response, no_cache=True)
+
+
+class OwnedValidatorsMixin:
+    """
+    Validators for per-user resources, from one aggregate over the user's rows.
+
+    List ETags combine the row count with max(updated_at) so deletions are
+    noticed too; Last-Modified is only sent for detail routes because a
+    deletion does not move max(updated_at) forward.
+    """
+    # Extra timestamps folded into the ETag, e.g. for embedded related rows
+    validator_related_fields = ()
+    # Whether the response embeds catalog data (products) and follows its version
+    validator_includes_catalog = False
+
+    def get_validators(self, request, **kwargs):
+        queryset = self.get_queryset().order_by()
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if lookup is not None:
+            try:
+                queryset = queryset.filter(**{self.lookup_field: lookup})
+            except (TypeError, ValueError, ValidationError):
+                # Not a valid key (e.g. /orders/abc/): leave the 404 to the view
+                return None, None
+
+        aggregates = {'modified': Max('updated_at'), 'rows': Count('pk')}
+        for i, field in enumerate(self.validator_related_fields):
+            aggregates[f'related_{i}'] = Max(field)
+        values = queryset.aggregate(**aggregates)
+        if lookup is not None and not values['rows']:
+            return None, None
+
+        parts = [request.user.pk] + [
+            values[key].isoformat() if hasattr(values[key], 'isoformat') else values[key]
+            for key in sorted(values)
+        ]
+        if self.validator_includes_catalog:
+            parts.append(get_catalog_version())
+        seed = '-'.join(str(part) for part in parts)
+
+        if lookup is None:
+            return seed, None
+        modified = timestamp(values['modified'])
+        for key in values:
+            if key.startswith('related_') and values[key] is not None:
+                modified = max(modified, timestamp(values[key]))
+        if self.validator_includes_catalog:
+            modified = max(modified, get_catalog_last_modified() or 0)
+        return seed, modified
+
+    def patch_conditional_headers(self, response):
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
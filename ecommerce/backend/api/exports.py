@@ -0,0 +1,187 @@
+"""
+Streaming CSV / NDJSON exports of products, orders and order items
+
+Rows are read in primary-key order one chunk per query (keyset, not OFFSET),
+so an export of millions of rows holds one chunk in memory, needs no
+long-lived cursor and starts producing output after the first query. Under
+ASGI the view wraps the stream in async_chunks, since Django would otherwise
+collect a sync streaming response into a list before sending it. Product
+columns use the import_catalog names, so an export can be re-imported. CSV
+text cells that a spreadsheet would run as a formula (=, +, -, @...), or that
+already start with ', get a leading ' so they stay text; import_catalog takes
+it off again (strip_csv_guard), so names, descriptions and slugs round-trip.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order, OrderItem, Product
+
+CHUNK_SIZE = 2000
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+CSV_GUARD = "'"
+# A guarded cell is the guard followed by one of these
+GUARDED_PREFIXES = FORMULA_PREFIXES + (CSV_GUARD,)
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    """Invalid export name or filter value"""
+
+
+# dataset -> (queryset factory, {output column: model field path}, created_at path, status path)
+DATASETS = {
+    'products': (
+        lambda: Product.objects.all(),
+        {
+            'id': 'id', 'slug': 'slug', 'name': 'name', 'description': 'description',
+            'price': 'price', 'original_price': 'original_price', 'discount': 'discount',
+            'stock': 'stock', 'rating': 'rating', 'reviews_count': 'reviews_count',
+            'is_active': 'is_active', 'image_url': 'image_url', 'category': 'category__slug',
+            'created_at': 'created_at', 'updated_at': 'updated_at',
+        },
+        'created_at',
+        None,
+    ),
+    'orders': (
+        lambda: Order.objects.all(),
+        {
+            'id': 'id', 'order_number': 'order_number', 'user_id': 'user_id', 'username': 'user__username',
+            'status': 'status', 'subtotal': 'subtotal', 'shipping_cost': 'shipping_cost',
+            'discount': 'discount', 'total': 'total', 'payment_method': 'payment_method',
+            'city': 'delivery_address__city', 'country': 'delivery_address__country',
+            'created_at': 'created_at', 'updated_at': 'updated_at',
+        },
+        'created_at',
+        'status',
+    ),
+    'order-items': (
+        lambda: OrderItem.objects.all(),
+        {
+            'id': 'id', 'order_id': 'order_id', 'order_number': 'order__order_number',
+            'order_status': 'order__status', 'order_created_at': 'order__created_at',
+            'product_id': 'product_id', 'product_name': 'product_name',
+            'quantity': 'quantity', 'price': 'price', 'total': 'total',
+        },
+        'order__created_at',
+        'order__status',
+    ),
+}
+
+
+def parse_bound(value, name, end=False):
+    """ISO date or datetime; a bare date as an upper bound includes that whole day"""
+    try:
+        parsed = parse_datetime(value)
+        day = parse_date(value) if parsed is None else None
+    except ValueError:
+        # Well formed but impossible, e.g. 2026-13-45
+        raise ExportError(f'{name} is not a valid date or datetime')
+    if parsed is None:
+        if day is None:
+            raise ExportError(f'{name} must be an ISO date or datetime')
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(dataset, created_after=None, created_before=None, status=None, category=None):
+    """Return (values() queryset in primary key order, [(column, field path)])"""
+    if dataset not in DATASETS:
+        raise ExportError(f'Unknown export {dataset!r}; choose from {", ".join(DATASETS)}')
+    factory, columns, created_path, status_path = DATASETS[dataset]
+    queryset = factory()
+
+    if created_after:
+        queryset = queryset.filter(**{f'{created_path}__gte': parse_bound(created_after, 'created_after')})
+    if created_before:
+        queryset = queryset.filter(**{f'{created_path}__lt': parse_bound(created_before, 'created_before', end=True)})
+    if status:
+        if status_path is None:
+            raise ExportError(f'{dataset} cannot be filtered by status')
+        statuses = [value.strip() for value in status.split(',') if value.strip()]
+        valid = {choice for choice, _ in Order.STATUS_CHOICES}
+        if not set(statuses) <= valid:
+            raise ExportError(f'status must be among {", ".join(sorted(valid))}')
+        queryset = queryset.filter(**{f'{status_path}__in': statuses})
+    if category:
+        if dataset != 'products':
+            raise ExportError(f'{dataset} cannot be filtered by category')
+        queryset = queryset.filter(category__slug=category)
+
+    return queryset.order_by('pk').values(*columns.values()), list(columns.items())
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Yield lists of rows, one keyset query per chunk"""
+    last = None
+    while True:
+        chunk = list((queryset if last is None else queryset.filter(pk__gt=last))[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]['id']
+
+
+def csv_cell(value):
+    # Spreadsheets run text starting with these as a formula; a leading ' makes it text.
+    # Text already starting with ' is guarded too, so strip_csv_guard can always undo it.
+    if isinstance(value, str) and value.startswith(GUARDED_PREFIXES):
+        return CSV_GUARD + value
+    return value
+
+
+def strip_csv_guard(value):
+    """Undo csv_cell on a cell read back from a CSV export"""
+    if value.startswith(CSV_GUARD) and value[1:].startswith(GUARDED_PREFIXES):
+        return value[1:]
+    return value
+
+
+class _Line:
+    """File-like target for csv.writer that hands back what was written"""
+
+    def write(self, value):
+        return value
+
+
+def render_chunks(rows_chunks, columns, export_format):
+    """Yield encoded output, one piece per chunk (plus a CSV header first)"""
+    if export_format == 'ndjson':
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        for chunk in rows_chunks:
+            yield ''.join(
+                encoder.encode({name: row[path] for name, path in columns}) + '\n' for row in chunk
+            ).encode()
+        return
+
+    writer = csv.writer(_Line())
+    yield writer.writerow([name for name, _ in columns]).encode()
+    for chunk in rows_chunks:
+        yield ''.join(writer.writerow([csv_cell(row[path]) for _, path in columns]) for row in chunk).encode()
+
+
+def stream_export(dataset, export_format, chunk_size=CHUNK_SIZE, **filters):
+    """Validate everything up front, then return a lazy iterator of bytes"""
+    if export_format not in FORMATS:
+        raise ExportError(f'Unknown format {export_format!r}; choose from {", ".join(FORMATS)}')
+    queryset, columns = export_queryset(dataset, **filters)
+    return render_chunks(iter_chunks(queryset, chunk_size), columns, export_format)
+
+
+async def async_chunks(chunks):
+    """Async iterator over a sync iterator of bytes, one thread hop per piece"""
+    fetch = sync_to_async(next)
+    while True:
+        chunk = await fetch(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,339 @@
+"""
+Faceted product filtering
+
+`/api/products/` accepts min_price, max_price, in_stock, min_rating and
+min_discount next to category; ProductFacetFilter (filters.py) applies them
+in SQL, where the partial indexes on price and discount serve them. With
+`?facets=true` the response also carries counts for every facet value. Each
+facet is counted with all the other filters applied but not its own, so the
+counts say what choosing a value would give.
+
+The counts come from FacetSnapshot, one column per facet field over all active
+products in array.array columns, kept current per process as a LiveSnapshot
+(see snapshots.py). With NumPy installed the columns are counted as vectors
+without copying them; without it a single Python pass counts every facet at
+once, which is fine for catalogs of tens of thousands of products.
+"""
+from array import array
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+from .snapshots import LiveSnapshot
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Lower bounds of the price facet buckets; the last one is open-ended
+PRICE_EDGES = (0, 25, 50, 100, 250, 500, 1000)
+# "At least" facets, highest first
+RATING_THRESHOLDS = (4, 3, 2, 1)
+DISCOUNT_THRESHOLDS = (50, 25, 10)
+PRICE_EDGE_CENTS = [edge * 100 for edge in PRICE_EDGES]
+FACETS = ('category', 'price', 'in_stock', 'rating', 'discount')
+# Each row's price bucket, stock flag and thresholds met are packed into one
+# `cell` number, so one bincount counts those four facets together
+CELL_FACETS = ('price', 'in_stock', 'rating', 'discount')
+CELL_SHAPE = (len(PRICE_EDGES), 2, len(RATING_THRESHOLDS) + 1, len(DISCOUNT_THRESHOLDS) + 1)
+CELLS = CELL_SHAPE[0] * CELL_SHAPE[1] * CELL_SHAPE[2] * CELL_SHAPE[3]
+# Column -> array typecode; filters compare the raw values
+COLUMNS = {
+    'category': 'q',
+    'price': 'q',
+    'rating': 'h',
+    'discount': 'h',
+    'in_stock': 'b',
+    'cell': 'h',
+}
+# Snapshots with more dead rows than this share are compacted
+MAX_DEAD_SHARE = 0.25
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def hundredths(value):
+    """Prices and ratings as exact integer hundredths"""
+    return int(Decimal(str(value)) * 100)
+
+
+def cell_of(price_bucket, in_stock, rating_level, discount_level):
+    return ((price_bucket * CELL_SHAPE[1] + in_stock) * CELL_SHAPE[2] + rating_level) * CELL_SHAPE[3] + discount_level
+
+
+def marginal(cells, facet):
+    """Counts along one facet's axis of a flat cell histogram"""
+    axis = CELL_FACETS.index(facet)
+    stride = 1
+    for size in CELL_SHAPE[axis + 1:]:
+        stride *= size
+    counts = [0] * CELL_SHAPE[axis]
+    for cell, count in enumerate(cells):
+        if count:
+            counts[cell // stride % CELL_SHAPE[axis]] += int(count)
+    return counts
+
+
+def at_least(levels, thresholds):
+    """Counts per threshold (highest first) from a histogram of thresholds met"""
+    return [sum(levels[len(thresholds) - i:]) for i in range(len(thresholds))]
+
+
+def shape_counts(total, categories, cells):
+    """Raw counts from category counts and the cell histogram of each cell facet"""
+    in_stock = marginal(cells['in_stock'], 'in_stock')
+    return {
+        'total': total,
+        'category': categories,
+        'price': marginal(cells['price'], 'price'),
+        'in_stock': (in_stock[1], in_stock[0]),
+        'rating': at_least(marginal(cells['rating'], 'rating'), RATING_THRESHOLDS),
+        'discount': at_least(marginal(cells['discount'], 'discount'), DISCOUNT_THRESHOLDS),
+    }
+
+
+class FacetSnapshot:
+    """Facet fields of the active products, one array per column"""
+
+    def __init__(self, rows):
+        self.ids = array('q')
+        self.alive = array('B')
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self.position = {}  # product id -> row
+        self.dead = 0
+        for pk, *values in rows:
+            self.append(pk, self.encode(*values))
+
+    def __len__(self):
+        return len(self.position)
+
+    @staticmethod
+    def encode(category_id, price, stock, rating, discount):
+        price, rating, in_stock = hundredths(price), hundredths(rating), int(stock > 0)
+        cell = cell_of(
+            bisect_right(PRICE_EDGE_CENTS, price) - 1,
+            in_stock,
+            sum(rating >= threshold * 100 for threshold in RATING_THRESHOLDS),
+            sum(discount >= threshold for threshold in DISCOUNT_THRESHOLDS),
+        )
+        return category_id or 0, price, rating, discount, in_stock, cell
+
+    def append(self, pk, encoded):
+        self.position[pk] = len(self.ids)
+        self.ids.append(pk)
+        self.alive.append(1)
+        for column, value in zip(self.columns.values(), encoded):
+            column.append(value)
+
+    def add(self, pk, category_id, price, stock, rating, discount):
+        encoded = self.encode(category_id, price, stock, rating, discount)
+        row = self.position.get(pk)
+        if row is None:
+            return self.append(pk, encoded)
+        for column, value in zip(self.columns.values(), encoded):
+            column[row] = value
+
+    def remove(self, pk):
+        row = self.position.pop(pk, None)
+        if row is None:
+            return
+        self.alive[row] = 0
+        self.dead += 1
+        if self.dead > len(self.ids) * MAX_DEAD_SHARE:
+            self.compact()
+
+    def compact(self):
+        rows = [row for row in range(len(self.ids)) if self.alive[row]]
+        self.ids = array('q', (self.ids[row] for row in rows))
+        self.alive = array('B', [1]) * len(rows)
+        for name, column in self.columns.items():
+            self.columns[name] = array(column.typecode, (column[row] for row in rows))
+        self.position = {pk: row for row, pk in enumerate(self.ids)}
+        self.dead = 0
+
+    def counts(self, filters, product_ids=None):
+        """
+        Raw facet counts for parsed filters (see parse_filters), optionally
+        restricted to `product_ids` (e.g. search hits)
+        """
+        if numpy is not None and self.ids:
+            return self.vector_counts(filters, product_ids)
+        return self.scalar_counts(filters, product_ids)
+
+    def vector_counts(self, filters, product_ids):
+        # Views over the arrays, not copies; they must not outlive the caller's lock
+        column = {name: numpy.frombuffer(values, dtype=values.typecode) for name, values in self.columns.items()}
+        base = None
+        if self.dead:
+            base = numpy.frombuffer(self.alive, dtype=bool)
+        if product_ids is not None:
+            rows = [self.position[pk] for pk in product_ids if pk in self.position]
+            restricted = numpy.zeros(len(self.ids), dtype=bool)
+            restricted[rows] = True
+            base = restricted if base is None else base & restricted
+
+        masks = {}
+        if 'category' in filters:
+            masks['category'] = column['category'] == filters['category']
+        if 'min_price' in filters:
+            masks['price'] = column['price'] >= filters['min_price']
+        if 'max_price' in filters:
+            below = column['price'] <= filters['max_price']
+            masks['price'] = masks['price'] & below if 'price' in masks else below
+        if 'in_stock' in filters:
+            masks['in_stock'] = column['in_stock'] == int(filters['in_stock'])
+        if 'min_rating' in filters:
+            masks['rating'] = column['rating'] >= filters['min_rating']
+        if 'min_discount' in filters:
+            masks['discount'] = column['discount'] >= filters['min_discount']
+
+        def histogram(code, excluded=None, size=0):
+            """bincount over the rows passing every filter but `excluded`'s"""
+            selected = base
+            for name, mask in masks.items():
+                if name != excluded:
+                    selected = mask if selected is None else selected & mask
+            return numpy.bincount(code if selected is None else code[selected], minlength=size)
+
+        everything = histogram(column['cell'], size=CELLS)
+        cells = {
+            facet: histogram(column['cell'], facet, CELLS) if facet in masks else everything
+            for facet in CELL_FACETS
+        }
+        categories = histogram(column['category'], 'category')
+        return shape_counts(
+            int(everything.sum()),
+            {pk: int(count) for pk, count in enumerate(categories) if count and pk},
+            {facet: histogram.tolist() for facet, histogram in cells.items()},
+        )
+
+    def scalar_counts(self, filters, product_ids):
+        wanted = None if product_ids is None else set(product_ids)
+        category_filter = filters.get('category')
+        min_price, max_price = filters.get('min_price'), filters.get('max_price')
+        in_stock_filter = filters.get('in_stock')
+        min_rating, min_discount = filters.get('min_rating'), filters.get('min_discount')
+
+        categories = {}
+        everything = [0] * CELLS
+        # Rows failing only this facet's filter; they count towards this facet alone
+        own = {facet: [0] * CELLS for facet in CELL_FACETS}
+        rows = zip(self.ids, self.alive, *self.columns.values())
+        for pk, alive, category, price, rating, discount, in_stock, cell in rows:
+            if not alive or (wanted is not None and pk not in wanted):
+                continue
+            # A row counts towards every facet when it passes all filters, and
+            # towards one facet when that facet's filter is the only one it fails
+            failed = []
+            if category_filter is not None and category != category_filter:
+                failed.append('category')
+            if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                failed.append('price')
+            if in_stock_filter is not None and in_stock != in_stock_filter:
+                failed.append('in_stock')
+            if min_rating is not None and rating < min_rating:
+                failed.append('rating')
+            if min_discount is not None and discount < min_discount:
+                failed.append('discount')
+            if len(failed) > 1:
+                continue
+            if not failed:
+                everything[cell] += 1
+            elif failed[0] != 'category':
+                own[failed[0]][cell] += 1
+                continue
+            if category:
+                categories[category] = categories.get(category, 0) + 1
+
+        cells = {facet: [a + b for a, b in zip(everything, own[facet])] for facet in CELL_FACETS}
+        return shape_counts(sum(everything), categories, cells)
+
+
+facet_snapshot = LiveSnapshot(
+    FacetSnapshot, ('category_id', 'price', 'stock', 'rating', 'discount'), 'FACET_SNAPSHOT_TTL'
+)
+
+
+def parse_decimal(params, name, errors, low, high=None):
+    value = params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        errors[name] = 'A valid number is required.'
+        return None
+    if not number.is_finite() or number < low or (high is not None and number > high):
+        errors[name] = f'Must be between {low} and {high}.' if high is not None else f'Must be at least {low}.'
+        return None
+    return number
+
+
+def parse_filters(params):
+    """
+    Facet filters from query parameters, in snapshot units (hundredths for
+    prices and ratings); `category` stays a slug. Raises ValidationError.
+    """
+    errors, filters = {}, {}
+    for name, high in (('min_price', None), ('max_price', None), ('min_rating', 5), ('min_discount', 100)):
+        number = parse_decimal(params, name, errors, 0, high)
+        if number is not None:
+            filters[name] = int(number) if name == 'min_discount' else hundredths(number)
+    in_stock = params.get('in_stock', '').strip().lower()
+    if in_stock in TRUE_VALUES or in_stock in FALSE_VALUES:
+        filters['in_stock'] = in_stock in TRUE_VALUES
+    elif in_stock:
+        errors['in_stock'] = 'Must be true or false.'
+    if errors:
+        raise ValidationError(errors)
+    if params.get('category'):
+        filters['category'] = params['category']
+    return filters
+
+
+def wants_facets(request):
+    return request.query_params.get('facets', '').lower() in TRUE_VALUES
+
+
+def facet_counts(request):
+    """The `facets` object for a product list request"""
+    from .models import Category
+    from .search import get_search_backend
+
+    filters = parse_filters(request.query_params)
+    categories = {pk: (slug, name) for pk, slug, name in Category.objects.values_list('pk', 'slug', 'name')}
+    if 'category' in filters:
+        by_slug = {slug: pk for pk, (slug, _) in categories.items()}
+        # An unknown slug matches nothing, as in the product list
+        filters['category'] = by_slug.get(filters['category'], -1)
+
+    query = request.query_params.get('search', '')
+    product_ids = get_search_backend().results(query)[:] if query.strip() else None
+
+    snapshot = facet_snapshot.get()
+    with facet_snapshot.lock:
+        raw = snapshot.counts(filters, product_ids)
+
+    def bucket_bound(i):
+        return str(PRICE_EDGES[i]) if i < len(PRICE_EDGES) else None
+
+    return {
+        'total': raw['total'],
+        'category': sorted((
+            {'slug': categories[pk][0], 'name': categories[pk][1], 'count': count}
+            for pk, count in raw['category'].items() if pk in categories
+        ), key=lambda facet: facet['name']),
+        'price': [
+            {'min': bucket_bound(i), 'max': bucket_bound(i + 1), 'count': count}
+            for i, count in enumerate(raw['price'])
+        ],
+        'in_stock': {'true': raw['in_stock'][0], 'false': raw['in_stock'][1]},
+        'rating': [{'min': threshold, 'count': count} for threshold, count in zip(RATING_THRESHOLDS, raw['rating'])],
+        'discount': [
+            {'min': threshold, 'count': count} for threshold, count in zip(DISCOUNT_THRESHOLDS, raw['discount'])
+        ],
+    }
+
@@ -0,0 +1,220 @@
+"""
+Sparse fieldsets: ?fields=, ?omit= and ?expand= on GET responses
+
+    ?fields=id,name,price,category.slug    only these (dotted paths reach into nested objects)
+    ?omit=description,category.description everything but these
+    ?expand=category                       nested objects listed here stay objects; the
+                                           others collapse to their primary key(s)
+
+Without `expand` every nested object is rendered as before. The parameters are
+compiled once into a FieldPlan (cached per distinct query), which serializers
+apply to their fields and viewsets turn into only()/select_related()/
+prefetch_related() or values() columns, so fields that are not sent are not
+read from the database either.
+"""
+from functools import lru_cache
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+PARAMS = ('fields', 'omit', 'expand')
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def split(value):
+    return [path for path in (part.strip() for part in (value or '').split(',')) if path]
+
+
+class FieldPlan:
+    """Which fields to render at one level of a response, and the plans of its nested objects"""
+
+    def __init__(self, expand=None):
+        self.include = None  # None: every field
+        self.whole = set()  # included without narrowing their nested fields
+        self.exclude = set()
+        self.expand = expand  # None: expand every nested object
+        self.children = {}
+
+    def node(self, name):
+        if name not in self.children:
+            self.children[name] = FieldPlan(expand=None if self.expand is None else set())
+        return self.children[name]
+
+    def add_include(self, parts):
+        name, rest = parts[0], parts[1:]
+        child = self.node(name)
+        if not rest:
+            self.whole.add(name)
+            child.include = None
+        elif name not in self.whole:
+            if name not in self.include:
+                child.include = set()
+            child.add_include(rest)
+        self.include.add(name)
+
+    def add_exclude(self, parts):
+        if len(parts) == 1:
+            self.exclude.add(parts[0])
+        else:
+            self.node(parts[0]).add_exclude(parts[1:])
+
+    def add_expand(self, parts):
+        self.expand.add(parts[0])
+        if len(parts) > 1:
+            self.node(parts[0]).add_expand(parts[1:])
+
+    def child(self, name):
+        plan = self.children.get(name)
+        if plan is not None:
+            return plan
+        return EVERYTHING if self.expand is None else COLLAPSED
+
+    def allows(self, name):
+        return (self.include is None or name in self.include) and name not in self.exclude
+
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+
+    def check(self, available, path=''):
+        """Raise a ValidationError naming any field this level does not have"""
+        named = set(self.include or ()) | self.exclude | set(self.expand or ()) | set(self.children)
+        unknown = sorted(named - set(available))
+        if unknown:
+            raise serializers.ValidationError(
+                {'fields': [f'Unknown field(s): {", ".join(path + name for name in unknown)}']}
+            )
+
+
+EVERYTHING = FieldPlan()
+COLLAPSED = FieldPlan(expand=frozenset())
+
+
+@lru_cache(maxsize=512)
+def compile_plan(fields, omit, expand):
+    plan = FieldPlan(expand=None if expand is None else set())
+    if fields is not None:
+        plan.include = set()
+        for path in split(fields):
+            plan.add_include(path.split('.'))
+    for path in split(omit):
+        plan.add_exclude(path.split('.'))
+    for path in split(expand):
+        plan.add_expand(path.split('.'))
+    return plan
+
+
+def field_plan(request):
+    """The request's FieldPlan, or None when it has none of the parameters (or is not a GET)"""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    raw = tuple(params.get(name) for name in PARAMS)
+    if raw == (None, None, None):
+        return None
+    return compile_plan(*raw)
+
+
+def plan_for(serializer):
+    """The part of the request's plan that applies to `serializer`, wherever it is nested"""
+    plan = field_plan(serializer.context.get('request'))
+    if plan is None:
+        return None
+    path, node = [], serializer
+    while node.parent is not None:
+        if node.field_name:
+            path.append(node.field_name)
+        node = node.parent
+    for name in reversed(path):
+        plan = plan.child(name)
+    return plan, '.'.join(reversed(path))
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin that renders only the fields the request's FieldPlan
+    allows, and collapses unexpanded `expandable_fields` to primary keys.
+    """
+    # Nested fields that ?expand= controls: name -> whether it is a to-many relation
+    expandable_fields = {}
+    # Columns read by fields that are not a model field of the same name, for only()
+    field_columns = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        found = plan_for(self)
+        if found is None:
+            return fields
+        plan, path = found
+        plan.check(fields, f'{path}.' if path else '')
+        selected = {}
+        for name, field in fields.items():
+            if field.write_only:
+                selected[name] = field
+            elif not plan.allows(name):
+                continue
+            elif name in self.expandable_fields and not plan.expands(name):
+                selected[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, many=self.expandable_fields[name], source=field.source
+                )
+            else:
+                selected[name] = field
+        return selected
+
+
+def serializer_columns(serializer, prefix=''):
+    """
+    The only() columns and Prefetch objects for the fields `serializer` will
+    render, following nested serializers through select_related paths.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    extra = getattr(serializer, 'field_columns', {})
+    columns, prefetches = [f'{prefix}{model._meta.pk.name}'], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in extra:
+            columns.extend(prefix + column for column in extra[name])
+            continue
+        source = field.source.replace('.', '__')
+        many = isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField))
+        if many and prefix:
+            # Nested to-many relations are left to the default loading
+            continue
+        if many:
+            relation = model._meta.get_field(source)
+            child = field.child if isinstance(field, serializers.ListSerializer) else None
+            child_columns = serializer_columns(child)[0] if child is not None else ['pk']
+            queryset = relation.related_model.objects.only(*child_columns, relation.field.name)
+            prefetches.append(Prefetch(source, queryset=queryset))
+        elif isinstance(field, serializers.BaseSerializer):
+            columns.append(prefix + source)
+            nested, _ = serializer_columns(field, f'{prefix}{source}__')
+            columns.extend(nested)
+        elif source != '*':
+            columns.append(prefix + source)
+    return columns, prefetches
+
+
+def restrict_queryset(queryset, serializer):
+    """`queryset` loading just what `serializer` renders"""
+    columns, prefetches = serializer_columns(serializer)
+    relations = sorted({column.rsplit('__', 1)[0] for column in columns if '__' in column})
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    # A followed relation's own key column must be loaded too
+    return queryset.only(*columns, *relations).prefetch_related(*prefetches)
+
+
+class SparseFieldsViewMixin:
+    """Viewset mixin that trims list/retrieve querysets to the request's FieldPlan"""
+    sparse_actions = ('list', 'retrieve')
+
+    # list and retrieve both pass their queryset through here, whatever get_queryset does
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions or field_plan(self.request) is None:
+            return queryset
+        return restrict_queryset(queryset, self.get_serializer())
@@ -0,0 +1,38 @@
+"""
+API filter backends
+"""
+from decimal import Decimal
+
+from rest_framework import filters
+
+from .facets import parse_filters
+from .search import get_search_backend
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """`?search=` backed by the product search index instead of icontains scans"""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return get_search_backend().filter_queryset(queryset, query)
+
+
+class ProductFacetFilter(filters.BaseFilterBackend):
+    """min_price, max_price, in_stock, min_rating and min_discount; category is filtered by the view"""
+
+    def filter_queryset(self, request, queryset, view):
+        facet_filters = parse_filters(request.query_params)
+        lookups = {}
+        if 'min_price' in facet_filters:
+            lookups['price__gte'] = Decimal(facet_filters['min_price']) / 100
+        if 'max_price' in facet_filters:
+            lookups['price__lte'] = Decimal(facet_filters['max_price']) / 100
+        if 'in_stock' in facet_filters:
+            lookups['stock__gt' if facet_filters['in_stock'] else 'stock'] = 0
+        if 'min_rating' in facet_filters:
+            lookups['rating__gte'] = Decimal(facet_filters['min_rating']) / 100
+        if 'min_discount' in facet_filters:
+            lookups['discount__gte'] = facet_filters['min_discount']
+        return queryset.filter(**lookups)
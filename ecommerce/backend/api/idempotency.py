@@ -0,0 +1,149 @@
+"""
+Idempotency-Key support for unsafe POSTs
+
+A client that retries a POST with the same Idempotency-Key header gets the
+stored response of the first attempt replayed instead of a second write. The
+first request claims the key before running the view; a concurrent retry
+with the same key gets 409 until the first one finishes.
+
+Only successful responses are stored: an error, raised or returned, wrote
+nothing, so it releases the key for a real retry. Keys are scoped per user;
+anonymous keys are scoped by the request itself, so two clients that happen
+to pick the same key never see each other's outcome. Views whose response
+carries secrets (tokens) pass `store` and `replay` to keep only what is
+needed to rebuild it.
+"""
+import json
+from datetime import timedelta
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+# A claimed key whose request never finished (crashed worker) can be reused after this
+IN_PROGRESS_TIMEOUT = timedelta(seconds=60)
+# Expired keys deleted per new claim, so cleanup cost stays bounded
+PURGE_BATCH_SIZE = 100
+
+
+def get_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+
+
+def request_fingerprint(request):
+    # Keyed, since bodies carry passwords (register) and the hash is stored and
+    # used as the anonymous scope
+    body = json.dumps(request.data, sort_keys=True, cls=JSONEncoder, default=str)
+    raw = f'{request.method} {request.path} {body}'
+    return salted_hmac(
+        'api.idempotency.request_fingerprint', raw, secret=settings.SECRET_KEY, algorithm='sha256'
+    ).hexdigest()
+
+
+def purge_expired(limit=PURGE_BATCH_SIZE):
+    expired = IdempotencyKey.objects.filter(expires_at__lt=timezone.now())
+    if limit is not None:
+        expired = IdempotencyKey.objects.filter(pk__in=list(expired.values_list('pk', flat=True)[:limit]))
+    return expired.delete()[0]
+
+
+def claim(scope, key, fingerprint):
+    """Return (record, created); an expired or abandoned record is taken over"""
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                scope=scope, key=key, request_hash=fingerprint, expires_at=now + get_ttl()
+            ), True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.get(scope=scope, key=key)
+    abandoned = record.status_code is None and record.created_at < now - IN_PROGRESS_TIMEOUT
+    if record.expires_at < now or abandoned:
+        taken = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+            request_hash=fingerprint, status_code=None, response_body='',
+            created_at=now, expires_at=now + get_ttl()
+        )
+        if taken:
+            record.refresh_from_db()
+            return record, True
+        record.refresh_from_db()
+    return record, False
+
+
+def get_scope(request, fingerprint):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'anonymous:{fingerprint[:54]}'
+
+
+def idempotent(view=None, store=None, replay=None):
+    """
+    Decorate a view function or viewset method to honour Idempotency-Key.
+
+    `store(response)` returns what to keep of a successful response (default
+    its data) and `replay(stored)` rebuilds the Response from it.
+    """
+    if view is None:
+        return partial(idempotent, store=store, replay=replay)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = args[0] if isinstance(args[0], Request) else args[1]
+        key = request.META.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, created = claim(get_scope(request, fingerprint), key, fingerprint)
+
+        if not created:
+            if record.request_hash != fingerprint:
+                return Response(
+                    {'error': 'Idempotency-Key was already used with a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.status_code is None:
+                return Response(
+                    {'error': 'A request with this Idempotency-Key is still in progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            stored = json.loads(record.response_body)
+            response = replay(stored) if replay is not None else Response(stored)
+            response.status_code = record.status_code
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        purge_expired()
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 400:
+            # Like a raised error, nothing was written; let the client retry for real
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            stored = store(response) if store is not None else response.data
+            record.response_body = json.dumps(stored, cls=JSONEncoder)
+            record.save(update_fields=['status_code', 'response_body'])
+        return response
+    return wrapper
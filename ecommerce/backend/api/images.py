@@ -0,0 +1,240 @@
+"""
+Responsive image derivatives for uploaded Product and Category images
+
+Each upload is re-encoded at IMAGE_DERIVATIVE_WIDTHS (never wider than the
+original) in every IMAGE_DERIVATIVE_FORMATS format and stored beside it under
+derived/, e.g. products/shoe.jpg -> products/derived/shoe-320w.webp (plus a
+content hash with api.media.HashedFileSystemStorage). The object's
+image_variants records the source name, the widths and the stored name of each
+file, so serializers build srcset strings without touching storage.
+
+New uploads get their derivatives after commit, in a background thread (see
+signals.py); `manage.py build_image_derivatives` backfills existing media in
+worker processes. External image URLs on hosts that resize on request
+(IMAGE_RESIZING_HOSTS) get a srcset of resized URLs instead.
+"""
+import logging
+import math
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Q
+
+from .cache import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 1024)
+DEFAULT_FORMATS = ('webp', 'jpeg')
+# Pillow format and encoder options per derivative format
+ENCODERS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# imgix-style `fm` values for resizing hosts
+URL_FORMATS = {'webp': 'webp', 'jpeg': 'jpg'}
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def derivative_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def derivative_formats():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', DEFAULT_FORMATS))
+
+
+def derivative_name(name, width, fmt):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'derived', f'{stem}-{width}w.{fmt}')
+
+
+def derivative_names(variants):
+    return [name for names in variants.get('files', {}).values() for name in names]
+
+
+def encode(image, fmt):
+    from PIL import Image
+
+    pil_format, options = ENCODERS[fmt]
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha; flatten transparent images onto white
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if image.mode == 'RGBA' else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_derivatives(storage, name, widths=None, formats=None):
+    """Write the derivatives of the stored image `name`; returns its image_variants"""
+    # Pillow is only needed where derivatives are made; keep it out of startup imports
+    from PIL import Image, ImageOps
+
+    widths = widths or derivative_widths()
+    formats = formats or derivative_formats()
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        # Let the JPEG decoder scale down by a power of two when even the largest width allows it
+        rotated = image.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS
+        ratio = max(widths) / (image.height if rotated else image.width)
+        if ratio < 1:
+            image.draft(None, (math.ceil(image.width * ratio), math.ceil(image.height * ratio)))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    made = sorted({min(width, image.width) for width in widths}, reverse=True)
+    files = {fmt: [] for fmt in formats}
+    for width in made:
+        height = max(1, round(image.height * width / image.width))
+        if width < image.width:
+            # Each step shrinks the previous one, which is cheaper than starting from the original
+            image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            derivative = derivative_name(name, width, fmt)
+            files[fmt].insert(0, storage.save(derivative, ContentFile(encode(image, fmt), name=derivative)))
+    return {'source': name, 'widths': made[::-1], 'files': files}
+
+
+def delete_derivatives(storage, variants, keep=None):
+    kept = set(derivative_names(keep or {}))
+    for name in derivative_names(variants):
+        if name not in kept:
+            storage.delete(name)
+
+
+def needs_derivatives(instance):
+    """True when the recorded derivatives were not made from the current image"""
+    return (instance.image.name or '') != (instance.image_variants or {}).get('source', '')
+
+
+def record_derivatives(model, pk, name, previous, variants):
+    """
+    Save `variants` as the derivatives of the object's image `name`; False,
+    with the new files removed, when the image was replaced meanwhile.
+    """
+    storage = model._meta.get_field('image').storage
+    current = Q(image=name) if name else Q(image='') | Q(image__isnull=True)
+    if not model.objects.filter(current, pk=pk).update(image_variants=variants):
+        delete_derivatives(storage, variants, keep=previous)
+        return False
+    delete_derivatives(storage, previous, keep=variants)
+    bump_catalog_version()
+    return True
+
+
+def update_derivatives(model, pk):
+    """Bring one object's derivatives in line with its current image"""
+    instance = model.objects.filter(pk=pk).only('image', 'image_variants').first()
+    if instance is None or not needs_derivatives(instance):
+        return
+    name = instance.image.name or ''
+    variants = render_derivatives(instance.image.storage, name) if name else {}
+    record_derivatives(model, pk, name, instance.image_variants or {}, variants)
+
+
+def run_update(model, pk):
+    try:
+        update_derivatives(model, pk)
+    except Exception:
+        logger.exception('Could not build image derivatives for %s %s', model._meta.label, pk)
+    finally:
+        # Connections are per thread; do not leave this one open in the pool
+        connections.close_all()
+
+
+def executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        # A pool inherited through fork has no threads behind it
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_DERIVATIVE_THREADS', 1),
+                thread_name_prefix='image-derivatives',
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def schedule_derivatives(instance):
+    """Build the derivatives for a saved object's image once the save is committed"""
+    model, pk = type(instance), instance.pk
+    if getattr(settings, 'IMAGE_DERIVATIVES_IN_BACKGROUND', True):
+        transaction.on_commit(lambda: executor().submit(run_update, model, pk))
+    else:
+        transaction.on_commit(lambda: update_derivatives(model, pk))
+
+
+def render_stored(model_label, name):
+    """render_derivatives for a worker process, which only needs the model's storage"""
+    from django.apps import apps
+
+    return render_derivatives(apps.get_model(model_label)._meta.get_field('image').storage, name)
+
+
+def setup_worker():
+    # Spawned workers start without Django; forked ones already have it
+    import django
+
+    django.setup()
+
+
+def image_srcset(variants, name, url):
+    """{format: srcset} for the derivatives of the image `name`, or None when it has none yet"""
+    if not name or not variants or variants.get('source') != name:
+        return None
+    widths = variants['widths']
+    return {
+        fmt: ', '.join(f'{url(file)} {width}w' for width, file in zip(widths, files))
+        for fmt, files in variants['files'].items()
+    }
+
+
+@lru_cache(maxsize=4096)
+def _resized_srcset(url, hosts, widths, formats):
+    parts = urlsplit(url)
+    if parts.hostname not in hosts:
+        return None
+    query = dict(parse_qsl(parts.query))
+    try:
+        width, height = int(query.get('w', 0)), int(query.get('h', 0))
+    except ValueError:
+        return None
+    made = sorted({min(w, width) if width else w for w in widths})
+    srcset = {}
+    for fmt in formats:
+        entries = []
+        for w in made:
+            resized = {**query, 'w': w, 'fm': URL_FORMATS[fmt]}
+            if width and height:
+                resized['h'] = max(1, round(height * w / width))
+            entries.append(f'{urlunsplit(parts._replace(query=urlencode(resized)))} {w}w')
+        srcset[fmt] = ', '.join(entries)
+    return srcset
+
+
+def resized_srcset(url):
+    """{format: srcset} of resized URLs when `url` is on a host that resizes on request, else None"""
+    if not url:
+        return None
+    srcset = _resized_srcset(
+        url, tuple(getattr(settings, 'IMAGE_RESIZING_HOSTS', ())), derivative_widths(), derivative_formats()
+    )
+    return dict(srcset) if srcset is not None else None
+
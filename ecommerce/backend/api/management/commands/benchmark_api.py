@@ -0,0 +1,316 @@
+"""
+Management command to benchmark every API route through the full Django stack
+"""
+import json
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.settings import api_settings
+
+from api.authentication import ClaimsRefreshToken
+from api.models import Address, CartItem, Order, Product
+from api.perf import isolated_database, api_client
+from api.search import get_search_backend
+from api.synthetic import SAMPLE_PASSWORD, Progress, SyntheticDataset
+
+# path and body are format templates / dicts, or callables of (context, iteration).
+# setup(context, iteration) runs untimed before each request; limit caps the
+# request count for deliberately slow routes (password hashing).
+Route = namedtuple('Route', 'label method path auth body setup limit', defaults=(None, None, None))
+
+ORDERINGS = ('-created_at', 'price', '-price', 'name', '-discount')
+MAX_PAGES = 10
+
+
+def page(path):
+    """
+    Cycle through the first ten pages (or as many as the query has) so repeated
+    requests are not all one cache entry
+    """
+    joiner = '&' if '?' in path else '?'
+
+    def build(ctx, i):
+        base = path.format(**ctx)
+        pages = ctx['page_counts'].get(base)
+        if pages is None:
+            # Untimed: resolving the path happens before the request is sent
+            response = ctx['clients'][False].get(base)
+            count = response.json().get('count', 0) if response.status_code == 200 else 0
+            pages = ctx['page_counts'][base] = max(1, min(MAX_PAGES, math.ceil(count / api_settings.PAGE_SIZE)))
+        return f'{base}{joiner}page={i % pages + 1}'
+    return build
+
+
+def product_detail(ctx, i):
+    return f'/api/products/{ctx["product_slugs"][i % len(ctx["product_slugs"])]}/'
+
+
+def fill_cart(ctx, i):
+    CartItem.objects.filter(user=ctx['user']).delete()
+    CartItem.objects.bulk_create([
+        CartItem(user=ctx['user'], product_id=product_id, quantity=1) for product_id in ctx['checkout_products']
+    ])
+
+
+def spare_cart_item(ctx, i):
+    item, _ = CartItem.objects.get_or_create(user=ctx['user'], product_id=ctx['checkout_products'][0])
+    ctx['cart_item'] = item.pk
+
+
+ROUTES = [
+    Route('category list', 'get', '/api/categories/', False),
+    Route('category detail', 'get', '/api/categories/{category_slug}/', False),
+    Route('category products', 'get', '/api/categories/{category_slug}/products/', False),
+    Route('product detail', 'get', product_detail, False),
+    Route('product search', 'get', page('/api/products/search/?q=wireless'), False),
+    Route('product search (prefix)', 'get', '/api/products/search/?q=hea', False),
+    Route('product suggest', 'get', '/api/products/suggest/?q=hea', False),
+    Route('product list (search)', 'get', page('/api/products/?search=premium'), False),
+    Route('product list (facets)', 'get', page('/api/products/?facets=true&min_price=25&min_rating=4'), False),
+    Route('product list (card fields)', 'get',
+          page('/api/products/?fields=id,name,slug,price,original_price,image,image_srcset,rating&expand='), False),
+] + [
+    route
+    for ordering in ORDERINGS
+    for route in (
+        Route(f'product list ({ordering})', 'get', page(f'/api/products/?ordering={ordering}'), False),
+        Route(f'product list (category, {ordering})', 'get',
+              page(f'/api/products/?category={{category_slug}}&ordering={ordering}'), False),
+        Route(f'product list (cursor, {ordering})', 'get', f'/api/products/?cursor=&ordering={ordering}', False),
+    )
+] + [
+    Route('login', 'post', '/api/auth/login/', False,
+          {'username': '{username}', 'password': SAMPLE_PASSWORD}, limit=20),
+    Route('register', 'post', '/api/auth/register/', False, lambda ctx, i: {
+        'username': f'bench-{time.time_ns()}', 'email': f'bench-{i}@example.com',
+        'password': 'Correct-Horse-42!', 'password2': 'Correct-Horse-42!',
+    }, limit=20),
+    Route('token refresh', 'post', '/api/auth/token/refresh/', False, {'refresh': '{refresh}'}, limit=50),
+    Route('current user', 'get', '/api/auth/user/', True),
+    Route('address list', 'get', '/api/addresses/', True),
+    Route('address create', 'post', '/api/addresses/', True, {
+        'full_name': 'Bench Shopper', 'phone': '+96550000000', 'address': 'Block 1, Street 2',
+        'city': 'Salmiya', 'state': 'Hawalli', 'zip_code': '20001',
+    }),
+    Route('cart list', 'get', '/api/cart/', True),
+    Route('cart total', 'get', '/api/cart/total/', True),
+    Route('cart add', 'post', '/api/cart/', True, {'product_id': '{product_id}', 'quantity': 1}),
+    Route('cart update', 'patch', '/api/cart/{cart_item}/', True,
+          lambda ctx, i: {'quantity': i % 5 + 1}, setup=spare_cart_item),
+    Route('cart remove', 'delete', '/api/cart/{cart_item}/', True, setup=spare_cart_item),
+    Route('cart batch', 'post', '/api/cart/batch/', True, lambda ctx, i: {'operations': [
+        {'op': 'set', 'product_id': product_id, 'quantity': i % 3 + 1} for product_id in ctx['checkout_products']
+    ]}),
+    Route('order list', 'get', '/api/orders/', True),
+    Route('order list (cursor)', 'get', '/api/orders/?cursor=', True),
+    Route('order list (summary)', 'get', '/api/orders/?fields=id,order_number,status,total,created_at', True),
+    Route('order detail', 'get', '/api/orders/{order_id}/', True),
+    Route('create order', 'post', '/api/orders/create_order/', True,
+          {'delivery_address_id': '{address_id}', 'payment_method': 'card'}, setup=fill_cart),
+    Route('catalog cache stats', 'get', '/api/catalog/cache-stats/', 'staff'),
+]
+
+
+def resolve(template, ctx, iteration):
+    if callable(template):
+        return template(ctx, iteration)
+    if isinstance(template, str):
+        return template.format(**ctx)
+    if isinstance(template, dict):
+        return {key: resolve(value, ctx, iteration) for key, value in template.items()}
+    return template
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Measures latency percentiles, throughput, queries and memory of every API route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per route')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per route first')
+        parser.add_argument('--profile-samples', type=int, default=5,
+                            help='Requests per route measured for queries and memory')
+        parser.add_argument('--route', action='append', default=[],
+                            help='Only run routes whose label contains this text (repeatable)')
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Clear the catalog cache before every request')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--compare', help='Baseline JSON from an earlier --output run')
+        parser.add_argument('--max-regression', type=float, default=0.2,
+                            help='Allowed p95 slowdown versus --compare before failing (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        routes = [
+            route for route in ROUTES
+            if not options['route'] or any(text in route.label for text in options['route'])
+        ]
+        if not routes:
+            raise CommandError('No route matches --route')
+
+        with isolated_database():
+            ctx = self.seed(options)
+            results = {route.label: self.run_route(route, ctx, options) for route in routes}
+
+        report = {
+            'meta': {
+                'created_at': datetime.now(dt_timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                **{key: options[key] for key in (
+                    'requests', 'warmup', 'profile_samples', 'cold_cache', 'seed', 'products', 'users', 'orders'
+                )},
+            },
+            'routes': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        failed = [label for label, result in results.items() if result['errors']]
+        if failed:
+            # Timings of error responses say nothing about the route
+            raise CommandError(f'{len(failed)} route(s) answered with errors: {", ".join(failed)}')
+
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+            regressions = self.compare(baseline['routes'], results, options['max_regression'])
+            if regressions:
+                raise CommandError(f'{len(regressions)} route(s) regressed: {", ".join(regressions)}')
+
+    def seed(self, options):
+        self.stdout.write('Seeding benchmark data...')
+        dataset = SyntheticDataset(
+            options['seed'], datetime(2026, 1, 1, tzinfo=dt_timezone.utc), 5000, Progress(self.stdout.write)
+        )
+        dataset.generate(categories=40, products=options['products'], users=options['users'],
+                         orders=options['orders'])
+        get_search_backend().rebuild()
+
+        # The first synthetic shopper is also the most frequent customer
+        user = User.objects.get(username='shopper0000001')
+        staff = User.objects.create_user('bench-staff', password=SAMPLE_PASSWORD, is_staff=True)
+        checkout_products = list(
+            Product.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)[:3]
+        )
+        Product.objects.filter(pk__in=checkout_products).update(stock=10 ** 9)
+        product = Product.objects.filter(is_active=True).select_related('category').first()
+
+        return {
+            'user': user,
+            'username': user.username,
+            'refresh': str(ClaimsRefreshToken.for_user(user)),
+            'clients': {False: api_client(), True: api_client(user), 'staff': api_client(staff)},
+            'category_slug': product.category.slug,
+            'product_id': product.pk,
+            'product_slugs': list(Product.objects.filter(is_active=True).values_list('slug', flat=True)[:500]),
+            'order_id': Order.objects.filter(user=user).values_list('pk', flat=True).first(),
+            'address_id': Address.objects.filter(user=user, is_default=True).values_list('pk', flat=True).first(),
+            'checkout_products': checkout_products,
+            'page_counts': {},
+        }
+
+    def request(self, route, ctx, iteration):
+        if route.setup:
+            route.setup(ctx, iteration)
+        path = resolve(route.path, ctx, iteration)
+        body = resolve(route.body, ctx, iteration)
+        client = ctx['clients'][route.auth]
+        if route.method == 'get' or body is None:
+            return lambda: getattr(client, route.method)(path)
+        return lambda: getattr(client, route.method)(path, body, content_type='application/json')
+
+    def run_route(self, route, ctx, options):
+        count = min(options['requests'], route.limit or options['requests'])
+        catalog_cache = caches['catalog']
+
+        for i in range(min(options['warmup'], count)):
+            self.request(route, ctx, i)()
+
+        latencies, errors = [], 0
+        for i in range(count):
+            send = self.request(route, ctx, i)
+            if options['cold_cache']:
+                catalog_cache.clear()
+            started = time.perf_counter()
+            response = send()
+            latencies.append(time.perf_counter() - started)
+            errors += not (200 <= response.status_code < 300 or response.status_code == 304)
+
+        # Separate pass: query capture and tracemalloc would distort the timings above
+        queries, allocated = [], []
+        tracemalloc.start()
+        try:
+            for i in range(options['profile_samples']):
+                send = self.request(route, ctx, count + i)
+                if options['cold_cache']:
+                    catalog_cache.clear()
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                with CaptureQueriesContext(connection) as captured:
+                    send()
+                allocated.append(tracemalloc.get_traced_memory()[1] - before)
+                queries.append(len(captured.captured_queries))
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        result = {
+            'requests': count,
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+            'throughput_rps': round(count / sum(latencies), 1),
+            'queries': round(statistics.fmean(queries), 2) if queries else None,
+            'peak_alloc_kb': round(statistics.median(allocated) / 1024, 1) if allocated else None,
+        }
+        style = self.style.ERROR if errors else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{route.label:<38} p50 {result["p50_ms"]:>7.2f}  p95 {result["p95_ms"]:>7.2f}  '
+            f'p99 {result["p99_ms"]:>7.2f} ms  {result["throughput_rps"]:>7.0f} req/s  '
+            f'{result["queries"] if queries else "-":>5} queries  '
+            f'{result["peak_alloc_kb"] if allocated else "-":>7} KB'
+            + (f'  {errors} errors' if errors else '')
+        ))
+        return result
+
+    def compare(self, baseline, results, max_regression):
+        self.stdout.write(f'\n{"route":<38} {"p95 before":>10} {"p95 after":>10} {"change":>8} {"queries":>9}')
+        regressions = []
+        for label, result in results.items():
+            before = baseline.get(label)
+            if before is None:
+                continue
+            change = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0
+            more_queries = (result['queries'] or 0) > (before['queries'] or 0)
+            regressed = change > max_regression or more_queries
+            style = self.style.ERROR if regressed else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{label:<38} {before["p95_ms"]:>10.2f} {result["p95_ms"]:>10.2f} {change:>+8.0%} '
+                f'{before["queries"]!s:>4}->{result["queries"]!s:<4}'
+            ))
+            if regressed:
+                regressions.append(label)
+        return regressions
@@ -0,0 +1,62 @@
+"""
+Management command to compare JWT authentication strategies
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.authentication import ClaimsJWTAuthentication, ClaimsRefreshToken
+from api.perf import isolated_database, seed_catalog, api_client
+
+
+class Command(BaseCommand):
+    help = 'Measures queries and latency of JWT authentication, before and after claims-based users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Authentications per strategy')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.run(options['requests'])
+
+    def run(self, count):
+        user = seed_catalog(categories=1, products_per_category=5, cart_items=5, orders=0)['user']
+        factory = RequestFactory()
+        strategies = [
+            ('JWTAuthentication (database user)', JWTAuthentication(), RefreshToken.for_user(user)),
+            ('ClaimsJWTAuthentication', ClaimsJWTAuthentication(), ClaimsRefreshToken.for_user(user)),
+        ]
+
+        self.stdout.write(f'{"authenticator":<36} {"queries/req":>12} {"us/req":>9}')
+        for label, authenticator, token in strategies:
+            header = f'Bearer {token.access_token}'
+            request = Request(factory.get('/api/cart/', HTTP_AUTHORIZATION=header))
+            authenticator.authenticate(request)  # warm up
+
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                for _ in range(count):
+                    authenticator.authenticate(request)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:<36} {len(ctx.captured_queries) / count:>12.3f} {elapsed / count * 1e6:>9.1f}'
+            )
+
+        # Full stack with the configured authentication classes
+        client = api_client(user)
+        for path in ('/api/auth/user/', '/api/cart/', '/api/orders/'):
+            client.get(path)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                for _ in range(50):
+                    client.get(path)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'GET {path:<32} {len(ctx.captured_queries) / 50:>8.1f} queries {elapsed / 50 * 1000:>7.2f} ms'
+            )
@@ -0,0 +1,50 @@
+"""
+Management command to benchmark checkout latency against cart size
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.checkout import place_order
+from api.models import CartItem, Product
+from api.perf import isolated_database, seed_catalog
+
+
+class Command(BaseCommand):
+    help = 'Measures create_order latency and query count for growing carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 10, 30, 100, 300])
+        parser.add_argument('--repeat', type=int, default=20, help='Checkouts per cart size')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.run(options['sizes'], options['repeat'])
+
+    def run(self, sizes, repeat):
+        largest = max(sizes)
+        seeded = seed_catalog(categories=4, products_per_category=(largest + 3) // 4, cart_items=0, orders=0)
+        user = seeded['user']
+        products = list(Product.objects.order_by('pk')[:largest])
+        Product.objects.update(stock=largest * repeat * len(sizes))
+
+        self.stdout.write(f'{"items":>6} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8}')
+        for size in sizes:
+            timings = []
+            for _ in range(repeat):
+                CartItem.objects.bulk_create([
+                    CartItem(user=user, product=product, quantity=1) for product in products[:size]
+                ])
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    place_order(user, payment_method='cash')
+                    timings.append(time.perf_counter() - started)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{size:>6} {statistics.median(timings) * 1000:>9.2f} {p95 * 1000:>9.2f} '
+                f'{len(ctx.captured_queries):>8}'
+            )
@@ -0,0 +1,295 @@
+"""
+Management command to compare concurrent-connection capacity of the WSGI and ASGI servers
+"""
+import asyncio
+import importlib.util
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.authentication import ClaimsRefreshToken
+from api.models import Category, Product
+from api.search import get_search_backend
+from api.synthetic import Progress, SyntheticDataset
+
+HOST = '127.0.0.1'
+
+# name -> (modules that must be importable, command line after `python -m`)
+SERVERS = {
+    'sync': (
+        ('gunicorn',),
+        ['gunicorn', 'shopvue.wsgi:application', '--bind', '{host}:{port}', '--workers', '{workers}',
+         '--log-level', 'warning'],
+    ),
+    'gunicorn-uvicorn': (
+        ('gunicorn', 'uvicorn'),
+        ['gunicorn', 'shopvue.asgi:application', '-k', 'uvicorn.workers.UvicornWorker',
+         '--bind', '{host}:{port}', '--workers', '{workers}', '--log-level', 'warning'],
+    ),
+    'uvicorn': (
+        ('uvicorn',),
+        ['uvicorn', 'shopvue.asgi:application', '--host', '{host}', '--port', '{port}',
+         '--workers', '{workers}', '--log-level', 'warning', '--no-access-log'],
+    ),
+}
+
+# Loaded by the servers instead of shopvue.settings: same stack, throwaway data
+SETTINGS_TEMPLATE = '''\
+from shopvue.settings import *  # noqa: F401,F403
+
+DATABASES['default']['NAME'] = {database!r}
+CACHES['catalog'] = {catalog_cache!r}
+'''
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def use_database(path):
+    connection.close()
+    connection.settings_dict['NAME'] = path
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(port, path, headers, timeout, trickle=0.0):
+    """One request on a fresh connection; returns the status code"""
+    async def exchange():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        try:
+            lines = [f'GET {path} HTTP/1.1', f'Host: {HOST}:{port}', 'Connection: close']
+            lines += [f'{name}: {value}' for name, value in headers.items()]
+            if trickle:
+                # A slow client: the request arrives a line at a time
+                for line in lines:
+                    writer.write(f'{line}\r\n'.encode())
+                    await writer.drain()
+                    await asyncio.sleep(trickle / len(lines))
+                writer.write(b'\r\n')
+            else:
+                writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        return int(response[9:12])
+    return await asyncio.wait_for(exchange(), timeout)
+
+
+class Command(BaseCommand):
+    help = 'Compares concurrent-connection capacity of gunicorn sync workers and uvicorn (ASGI) workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes per server')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64, 256],
+                            help='Open connections per measurement')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per measurement')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Extra connections that trickle their requests in over --slow-ms')
+        parser.add_argument('--slow-ms', type=int, default=1000)
+        parser.add_argument('--timeout', type=float, default=10.0, help='Seconds before a request counts as failed')
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Disable the catalog cache so every request reaches the database')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        servers = []
+        for name in options['servers']:
+            modules, _ = SERVERS[name]
+            missing = [module for module in modules if importlib.util.find_spec(module) is None]
+            if missing:
+                self.stdout.write(self.style.WARNING(f'Skipping {name}: {", ".join(missing)} not installed'))
+            else:
+                servers.append(name)
+        if not servers:
+            raise CommandError('None of the requested servers can run here')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            database = os.path.join(tmp, 'benchmark.sqlite3')
+            ctx = self.seed(database, options)
+            self.write_settings(tmp, database, options)
+
+            self.stdout.write(
+                f'\n{"server":<17} {"conns":>5} {"slow":>5} {"req/s":>8} {"p50 ms":>8} '
+                f'{"p95 ms":>8} {"p99 ms":>8} {"errors":>7}'
+            )
+            for name in servers:
+                with self.server(name, tmp, options) as port:
+                    results[name] = [
+                        self.measure(name, port, ctx, concurrency, options)
+                        for concurrency in options['concurrency']
+                    ]
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'created_at': datetime.now(dt_timezone.utc).isoformat(),
+                    'python': sys.version.split()[0],
+                    'cpus': os.cpu_count(),
+                    **{key: options[key] for key in (
+                        'workers', 'duration', 'slow_clients', 'slow_ms', 'timeout', 'cold_cache', 'seed', 'products'
+                    )},
+                },
+                'servers': results,
+            }
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def seed(self, database, options):
+        self.stdout.write('Seeding benchmark database...')
+        original = connection.settings_dict['NAME']
+        use_database(database)
+        try:
+            call_command('migrate', verbosity=0)
+            dataset = SyntheticDataset(
+                options['seed'], datetime(2026, 1, 1, tzinfo=dt_timezone.utc), 5000, Progress(self.stdout.write)
+            )
+            dataset.generate(categories=40, products=options['products'], users=10, orders=0)
+            get_search_backend().rebuild()
+
+            user = User.objects.get(username='shopper0000001')
+            return {
+                'token': str(ClaimsRefreshToken.for_user(user).access_token),
+                'category_slugs': list(Category.objects.values_list('slug', flat=True)),
+                'product_slugs': list(Product.objects.filter(is_active=True).values_list('slug', flat=True)[:500]),
+            }
+        finally:
+            use_database(original)
+
+    def write_settings(self, tmp, database, options):
+        if options['cold_cache']:
+            catalog_cache = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        else:
+            catalog_cache = {**settings.CACHES['catalog'], 'LOCATION': os.path.join(tmp, 'catalog-cache')}
+        with open(os.path.join(tmp, 'benchmark_settings.py'), 'w') as handle:
+            handle.write(SETTINGS_TEMPLATE.format(database=database, catalog_cache=catalog_cache))
+
+    @contextmanager
+    def server(self, name, tmp, options):
+        """Run one server on a free port for the duration of the block"""
+        port = free_port()
+        _, arguments = SERVERS[name]
+        argv = [sys.executable, '-m'] + [
+            argument.format(host=HOST, port=port, workers=options['workers']) for argument in arguments
+        ]
+        env = {key: value for key, value in os.environ.items() if key not in ('ASYNC_VIEWS', 'DATABASE_REPLICAS')}
+        env.update({
+            'DJANGO_SETTINGS_MODULE': 'benchmark_settings',
+            'PYTHONPATH': os.pathsep.join([tmp, str(settings.BASE_DIR)]),
+            'DEBUG': 'false',
+            'ALLOWED_HOSTS': HOST,
+        })
+        with open(os.path.join(tmp, f'{name}.log'), 'w+') as log:
+            process = subprocess.Popen(argv, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                self.wait_until_ready(name, process, log, port)
+                yield port
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    def wait_until_ready(self, name, process, log, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                break
+            try:
+                if asyncio.run(fetch(port, '/api/categories/', {}, timeout=2)) == 200:
+                    return
+            except (OSError, asyncio.TimeoutError, ValueError):
+                pass
+            time.sleep(0.2)
+        process.kill()
+        log.seek(0)
+        raise CommandError(f'{name} did not start:\n{log.read()[-2000:]}')
+
+    def routes(self, ctx):
+        """Endless (path, headers) mix of the async-served GET routes"""
+        auth = {'Authorization': f'Bearer {ctx["token"]}'}
+        for i in itertools.count():
+            page = i % 10 + 1
+            yield from (
+                (f'/api/products/?page={page}', {}),
+                (f'/api/products/?ordering=price&page={page}', {}),
+                (f'/api/products/{ctx["product_slugs"][i % len(ctx["product_slugs"])]}/', {}),
+                (f'/api/products/search/?q=wireless&page={page}', {}),
+                ('/api/categories/', {}),
+                (f'/api/categories/{ctx["category_slugs"][i % len(ctx["category_slugs"])]}/products/', {}),
+                ('/api/auth/user/', auth),
+            )
+
+    def measure(self, name, port, ctx, concurrency, options):
+        latencies, failures = asyncio.run(self.load(port, ctx, concurrency, options))
+        latencies.sort()
+        result = {
+            'concurrency': concurrency,
+            'slow_clients': options['slow_clients'],
+            'requests': len(latencies),
+            'errors': failures,
+            'throughput_rps': round(len(latencies) / options['duration'], 1),
+        }
+        for key, fraction in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            result[key] = round(percentile(latencies, fraction) * 1000, 1) if latencies else None
+
+        def cell(value):
+            return f'{value:>8.1f}' if value is not None else f'{"-":>8}'
+        line = (
+            f'{name:<17} {concurrency:>5} {options["slow_clients"]:>5} {result["throughput_rps"]:>8.1f} '
+            f'{cell(result["p50_ms"])} {cell(result["p95_ms"])} {cell(result["p99_ms"])} {failures:>7}'
+        )
+        self.stdout.write(self.style.WARNING(line) if failures else line)
+        return result
+
+    async def load(self, port, ctx, concurrency, options):
+        """Keep `concurrency` fast and `slow_clients` slow connections busy for the duration"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + options['duration']
+        routes = self.routes(ctx)
+        latencies, failures = [], 0
+
+        async def client(trickle):
+            nonlocal failures
+            while loop.time() < deadline:
+                path, headers = next(routes)
+                started = time.perf_counter()
+                try:
+                    status = await fetch(port, path, headers, options['timeout'], trickle)
+                except (OSError, asyncio.TimeoutError, ValueError):
+                    status = None
+                if status is None or status >= 400:
+                    failures += 1
+                elif not trickle:
+                    latencies.append(time.perf_counter() - started)
+
+        trickle = options['slow_ms'] / 1000
+        await asyncio.gather(
+            *(client(0.0) for _ in range(concurrency)),
+            *(client(trickle) for _ in range(options['slow_clients'])),
+        )
+        return latencies, failures
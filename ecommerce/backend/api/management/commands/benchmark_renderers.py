@@ -0,0 +1,78 @@
+"""
+Management command to benchmark the response renderers
+"""
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api import renderers
+from api.models import Order, Product
+from api.perf import isolated_database, seed_catalog
+from api.serializers import CatalogRowSerializer, OrderSerializer
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = "Compares REST framework's JSONRenderer with api.renderers' JSON and MessagePack renderers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Products per response')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per renderer')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.run(options['products'], options['repeat'])
+
+    def run(self, count, repeat):
+        seed_catalog(categories=8, products_per_category=max(count // 8, 1), orders=100, items_per_order=5)
+        request = Request(RequestFactory().get('/api/products/', HTTP_HOST='localhost'))
+        serializer = CatalogRowSerializer(request)
+        products = Product.objects.filter(is_active=True).order_by('-created_at', 'pk')[:count]
+        orders = Order.objects.select_related('delivery_address').prefetch_related('items__product')
+        payloads = {
+            f'{count} products': serializer.products(products.values(*serializer.product_columns())),
+            f'{len(orders)} orders': OrderSerializer(orders, many=True, context={'request': request}).data,
+        }
+
+        candidates = [('DRF JSONRenderer', JSONRenderer())]
+        fast_name = 'orjson' if renderers.orjson is not None else 'stdlib fallback'
+        candidates.append((f'JSONRenderer ({fast_name})', renderers.JSONRenderer()))
+        if renderers.msgpack is not None:
+            candidates.append(('MessagePackRenderer', renderers.MessagePackRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('msgpack is not installed; skipping MessagePack'))
+
+        for label, data in payloads.items():
+            reference = JSONRenderer().render(data)
+            if renderers.JSONRenderer().render(data) != reference:
+                raise CommandError(f'{label}: fast JSON output differs from REST framework')
+            if renderers.msgpack is not None:
+                packed = renderers.MessagePackRenderer().render(data)
+                if renderers.msgpack.unpackb(packed, raw=False) != json.loads(reference):
+                    raise CommandError(f'{label}: MessagePack output does not decode to the JSON data')
+
+            self.stdout.write(f'{label} (JSON output identical)')
+            self.stdout.write(f'  {"renderer":<28}{"encode":>10}{"bytes":>10}{"gzip":>10}')
+            baseline = None
+            for name, renderer in candidates:
+                content = renderer.render(data)
+                elapsed = best_of(repeat, lambda: renderer.render(data))
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f'  {name:<28}{elapsed * 1000:8.2f}ms{len(content):>10}{len(gzip.compress(content, 6)):>10}'
+                    f'  {baseline / elapsed:.1f}x'
+                )
+        self.stdout.write(self.style.SUCCESS('Done'))
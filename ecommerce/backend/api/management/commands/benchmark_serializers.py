@@ -0,0 +1,78 @@
+"""
+Management command to benchmark the catalog read serializers
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.models import Category, Product
+from api.perf import isolated_database, seed_catalog
+from api.serializers import CategorySerializer, ProductSerializer, CatalogRowSerializer
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = 'Compares ProductSerializer with the CatalogRowSerializer fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100, help='Products per response')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per serializer')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.run(options['products'], options['repeat'])
+
+    def run(self, count, repeat):
+        seed_catalog(categories=8, products_per_category=max(count // 8, 1))
+        # Cover every image branch: external URL, uploaded file and placeholder
+        ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        Product.objects.filter(pk__in=ids[0::3]).update(
+            image_url='https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=800'
+        )
+        Product.objects.filter(pk__in=ids[1::3]).update(image='products/sample.jpg')
+        Product.objects.filter(pk__in=ids[1::6]).update(image_variants={
+            'source': 'products/sample.jpg', 'widths': [320, 640], 'files': {
+                fmt: [f'products/derived/sample-{width}w.{fmt}' for width in (320, 640)] for fmt in ('webp', 'jpeg')
+            },
+        })
+
+        request = Request(RequestFactory().get('/api/products/', HTTP_HOST='localhost'))
+        queryset = Product.objects.filter(is_active=True).order_by('-created_at', 'pk')[:count]
+        renderer = JSONRenderer()
+
+        def drf():
+            products = list(queryset.select_related('category'))
+            return ProductSerializer(products, many=True, context={'request': request}).data
+
+        def fast():
+            serializer = CatalogRowSerializer(request)
+            return serializer.products(queryset.values(*serializer.product_columns()))
+
+        drf_bytes, fast_bytes = renderer.render(drf()), renderer.render(fast())
+        if drf_bytes != fast_bytes:
+            raise CommandError('Fast path output differs from ProductSerializer')
+        categories = Category.objects.all()
+        drf_categories = renderer.render(CategorySerializer(categories, many=True).data)
+        fast_categories = renderer.render(
+            CatalogRowSerializer().category_list(categories.values(*CatalogRowSerializer().category_columns()))
+        )
+        if drf_categories != fast_categories:
+            raise CommandError('Fast path output differs from CategorySerializer')
+
+        drf_time = best_of(repeat, drf)
+        fast_time = best_of(repeat, fast)
+        self.stdout.write(f'{count} products, {len(drf_bytes)} bytes, output identical')
+        self.stdout.write(f'ProductSerializer:    {drf_time * 1000:8.2f} ms')
+        self.stdout.write(f'CatalogRowSerializer: {fast_time * 1000:8.2f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {drf_time / fast_time:.1f}x'))
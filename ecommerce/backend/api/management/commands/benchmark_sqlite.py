@@ -0,0 +1,105 @@
+"""
+Management command to benchmark SQLite read/write throughput across worker processes
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+# The settings.py profile versus Django's stock sqlite3 behaviour
+PROFILES = {
+    'default': {'timeout': 5},
+    'production': None,  # filled from settings.DATABASES at runtime
+}
+
+
+def use_database(path, options):
+    connection.close()
+    connection.settings_dict['NAME'] = path
+    connection.settings_dict['OPTIONS'] = dict(options)
+
+
+def worker(path, options, seconds, write_ratio, seed, results):
+    import django
+    django.setup()
+    from api.models import Product
+
+    use_database(path, options)
+    rng = random.Random(seed)
+    product_ids = list(Product.objects.values_list('pk', flat=True))
+    reads = writes = errors = 0
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                # Read-then-write, like checkout: the pattern that deadlocks on lock upgrade
+                with transaction.atomic():
+                    pk = rng.choice(product_ids)
+                    stock = Product.objects.filter(pk=pk).values_list('stock', flat=True).get()
+                    Product.objects.filter(pk=pk).update(stock=stock + 1)
+                writes += 1
+            else:
+                list(Product.objects.filter(is_active=True).order_by('-created_at')
+                     .values('id', 'name', 'price')[:20])
+                reads += 1
+        except OperationalError:
+            errors += 1
+    connection.close()
+    results.put((reads, writes, errors))
+
+
+class Command(BaseCommand):
+    help = 'Measures read/write throughput of 1-8 worker processes sharing one SQLite file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+        parser.add_argument('--seconds', type=float, default=3.0, help='Run time per measurement')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that write')
+        parser.add_argument('--products', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        profiles = dict(PROFILES)
+        profiles['production'] = settings.DATABASES['default'].get('OPTIONS', {})
+        context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.stdout.write(f'{"profile":<11} {"workers":>7} {"reads/s":>9} {"writes/s":>9} {"errors":>7}')
+            for name, db_options in profiles.items():
+                path = os.path.join(tmp, f'{name}.sqlite3')
+                self.prepare(path, db_options, options['products'])
+                for count in options['workers']:
+                    results = context.Queue()
+                    processes = [
+                        context.Process(target=worker, args=(
+                            path, db_options, options['seconds'], options['write_ratio'], i, results
+                        ))
+                        for i in range(count)
+                    ]
+                    for process in processes:
+                        process.start()
+                    totals = [results.get() for _ in processes]
+                    for process in processes:
+                        process.join()
+
+                    reads = sum(r for r, _, _ in totals) / options['seconds']
+                    writes = sum(w for _, w, _ in totals) / options['seconds']
+                    errors = sum(e for _, _, e in totals)
+                    self.stdout.write(f'{name:<11} {count:>7} {reads:>9.0f} {writes:>9.0f} {errors:>7}')
+
+    def prepare(self, path, db_options, products):
+        from api.perf import seed_catalog
+
+        original = (connection.settings_dict['NAME'], connection.settings_dict['OPTIONS'])
+        use_database(path, db_options)
+        try:
+            call_command('migrate', verbosity=0)
+            seed_catalog(categories=10, products_per_category=products // 10, cart_items=0, orders=0)
+        finally:
+            use_database(*original)
@@ -0,0 +1,124 @@
+"""
+Management command to prepare the app in one process and optionally serve it
+"""
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.boot import (
+    SEED_COMMANDS, command_fingerprint, pending_migrations, profile_imports, record_seed, seed_is_current
+)
+from api.snapshots import warm_snapshots
+
+
+class Command(BaseCommand):
+    help = ('Migrates only when migrations are pending, seeds only when the seed commands changed, '
+            'then exits or hands off to gunicorn without starting Django again')
+    # Checks import every URLconf and model; `manage.py check` belongs in the build, not the boot
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--serve', action='store_true',
+                            help='Run gunicorn in this process after booting (PORT and WEB_CONCURRENCY apply)')
+        parser.add_argument('--bind', help='gunicorn bind address (default 0.0.0.0:$PORT)')
+        parser.add_argument('--workers', type=int, help='gunicorn workers (default $WEB_CONCURRENCY or 1)')
+        parser.add_argument('--skip-seed', action='store_true', help='Do not run the seed commands')
+        parser.add_argument('--force-seed', action='store_true',
+                            help='Run the seed commands even if their fingerprints match')
+        parser.add_argument('--check-imports', action='store_true',
+                            help='Only measure startup import time against the budget, then exit')
+        parser.add_argument('--import-budget-ms', type=float, default=settings.BOOT_IMPORT_BUDGET_MS)
+        parser.add_argument('--warn-only', action='store_true',
+                            help='With --check-imports, warn instead of failing when over the budget')
+
+    def handle(self, *args, **options):
+        if options['check_imports']:
+            return self.check_imports(options['import_budget_ms'], options['warn_only'])
+
+        started = time.perf_counter()
+        self.migrate()
+        if not options['skip_seed']:
+            self.seed(options['force_seed'])
+        self.stdout.write(self.style.SUCCESS(f'Booted in {(time.perf_counter() - started) * 1000:.0f} ms'))
+
+        if options['serve']:
+            self.serve(options)
+
+    def step(self, label, started):
+        self.stdout.write(f'  {label} ({(time.perf_counter() - started) * 1000:.0f} ms)')
+
+    def migrate(self):
+        started = time.perf_counter()
+        pending = pending_migrations()
+        if not pending:
+            return self.step('migrations up to date', started)
+        self.stdout.write(f'  {len(pending)} pending migration(s), migrating')
+        call_command('migrate', interactive=False, skip_checks=True, verbosity=0)
+        self.step('migrated', started)
+
+    def seed(self, force):
+        for command_name in SEED_COMMANDS:
+            started = time.perf_counter()
+            fingerprint = command_fingerprint(command_name)
+            if not force and seed_is_current(command_name, fingerprint):
+                self.step(f'{command_name}: unchanged, skipped', started)
+                continue
+            try:
+                call_command(command_name, verbosity=0)
+            except Exception as error:
+                # A seed failure should not keep the site down; it is retried on the next boot
+                self.stdout.write(self.style.WARNING(f'  {command_name} failed: {error}'))
+                continue
+            record_seed(command_name, fingerprint)
+            self.step(f'{command_name}: applied', started)
+
+    def serve(self, options):
+        try:
+            from gunicorn.app.base import BaseApplication
+        except ImportError:
+            raise CommandError('gunicorn is not installed')
+        from django.core.wsgi import get_wsgi_application
+        from django.urls import get_resolver
+
+        application = get_wsgi_application()
+        # Import the URLconf (and so every view) once, before the workers fork
+        get_resolver().url_patterns
+        # Workers inherit the in-memory snapshots instead of each building them on first use
+        warm_snapshots()
+        connections.close_all()
+
+        config = {key: options[key] for key in ('bind', 'workers') if options[key] is not None}
+
+        class Server(BaseApplication):
+            def load_config(self):
+                # Same precedence as the gunicorn CLI: GUNICORN_CMD_ARGS, then our options
+                env_args = self.cfg.parser().parse_args(self.cfg.get_cmd_args_from_env())
+                for key, value in vars(env_args).items():
+                    if value is not None and key != 'args':
+                        self.cfg.set(key.lower(), value)
+                for key, value in config.items():
+                    self.cfg.set(key, value)
+
+            def load(self):
+                return application
+
+        Server().run()
+
+    def check_imports(self, budget_ms, warn_only=False):
+        try:
+            total_ms, top_level = profile_imports()
+        except RuntimeError as error:
+            raise CommandError(f'The app failed to import:\n{error}')
+        for cumulative_ms, module in top_level[:10]:
+            self.stdout.write(f'  {cumulative_ms:>8.1f} ms  {module}')
+        message = f'Startup imports took {total_ms:.0f} ms (budget {budget_ms:.0f} ms)'
+        if total_ms > budget_ms:
+            # Import time varies with the build machine, so deploys only warn; CI enforces it
+            if warn_only:
+                self.stdout.write(self.style.WARNING(f'{message}; over budget'))
+                return
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,60 @@
+"""
+Management command to build responsive image derivatives for existing uploads
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.images import needs_derivatives, record_derivatives, render_stored, setup_worker
+from api.models import Category, Product
+
+MODELS = {'product': Product, 'category': Category}
+
+
+class Command(BaseCommand):
+    help = 'Builds the WebP/JPEG sizes of uploaded Product and Category images in worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that are already current')
+        parser.add_argument('--model', choices=sorted(MODELS), action='append',
+                            help='Only this model (repeatable; default all)')
+
+    def handle(self, *args, **options):
+        models = [MODELS[name] for name in options['model'] or sorted(MODELS)]
+        jobs = []
+        for model in models:
+            for instance in model.objects.exclude(image='').exclude(image__isnull=True).only('image', 'image_variants'):
+                if options['force'] or needs_derivatives(instance):
+                    jobs.append((model, instance.pk, instance.image.name, instance.image_variants or {}))
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS('All image derivatives are current'))
+            return
+
+        started = time.perf_counter()
+        built = failed = 0
+        # Workers only read and write media; forked ones must not share our database connection
+        connections.close_all()
+        context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1), mp_context=context,
+                                 initializer=setup_worker) as pool:
+            futures = {pool.submit(render_stored, model._meta.label, name): (model, pk, name, previous)
+                       for model, pk, name, previous in jobs}
+            for future in as_completed(futures):
+                model, pk, name, previous = futures[future]
+                try:
+                    variants = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'  {model._meta.label} {pk} ({name}): {error}'))
+                    continue
+                if record_derivatives(model, pk, name, previous, variants):
+                    built += 1
+
+        elapsed = time.perf_counter() - started
+        message = f'Built derivatives for {built} of {len(jobs)} image(s) in {elapsed:.1f} s'
+        self.stdout.write(self.style.WARNING(message) if failed else self.style.SUCCESS(message))
@@ -0,0 +1,85 @@
+"""
+Management command to enforce per-endpoint SQL query budgets
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.perf import isolated_database, seed_catalog, api_client
+
+
+# (label, method, path, authenticated, max queries)
+# Paths are formatted with the seeded objects so every detail route is covered.
+# Cart and order routes include the aggregate behind their ETag. The first
+# authenticated request checks the token fingerprint; later ones reuse it.
+QUERY_BUDGETS = [
+    ('category list', 'get', '/api/categories/', False, 2),
+    ('category detail', 'get', '/api/categories/{category.slug}/', False, 1),
+    ('category products', 'get', '/api/categories/{category.slug}/products/', False, 2),
+    ('product list', 'get', '/api/products/', False, 2),
+    ('product list (category)', 'get', '/api/products/?category={category.slug}', False, 2),
+    ('product list (ordered)', 'get', '/api/products/?ordering=-price', False, 2),
+    ('product list (cursor)', 'get', '/api/products/?cursor=&ordering=price', False, 1),
+    ('product detail', 'get', '/api/products/{product.slug}/', False, 1),
+    ('product search', 'get', '/api/products/search/?q=Product', False, 3),
+    ('product list (search)', 'get', '/api/products/?search=descr', False, 2),
+    # Builds the in-memory index on first use; later lookups run no queries
+    ('product suggest', 'get', '/api/products/suggest/?q=Prod', False, 1),
+    # Count, page, category names, and the facet snapshot on first use
+    ('product list (facets)', 'get', '/api/products/?facets=true&min_price=15&in_stock=true', False, 4),
+    # Card grid fields: only the columns they need, no category join
+    ('product list (fields)', 'get', '/api/products/?fields=id,name,slug,price,image,image_srcset&expand=', False, 2),
+    ('current user', 'get', '/api/auth/user/', True, 1),
+    ('address list', 'get', '/api/addresses/', True, 3),
+    ('cart list', 'get', '/api/cart/', True, 3),
+    ('cart total', 'get', '/api/cart/total/', True, 1),
+    ('order list', 'get', '/api/orders/', True, 4),
+    ('order list (cursor)', 'get', '/api/orders/?cursor=', True, 3),
+    # Order summaries skip the items prefetch
+    ('order list (summary)', 'get', '/api/orders/?fields=id,order_number,status,total,created_at', True, 3),
+    ('order detail', 'get', '/api/orders/{order.pk}/', True, 3),
+]
+
+
+class Command(BaseCommand):
+    help = 'Fails when any API endpoint runs more SQL queries than its budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-queries', action='store_true',
+            help='Print the SQL of endpoints that go over budget'
+        )
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            failures = self.check_budgets(options['verbose_queries'])
+
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint(s) over query budget: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All endpoints within query budget'))
+
+    def check_budgets(self, verbose_queries):
+        seeded = seed_catalog()
+        anonymous = api_client()
+        authenticated = api_client(seeded['user'])
+
+        failures = []
+        for label, method, path, needs_auth, budget in QUERY_BUDGETS:
+            client = authenticated if needs_auth else anonymous
+            url = path.format(**seeded)
+            with CaptureQueriesContext(connection) as ctx:
+                response = getattr(client, method)(url)
+            used = len(ctx.captured_queries)
+
+            if response.status_code >= 400:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'{label}: HTTP {response.status_code} for {url}'))
+            elif used > budget:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'{label}: {used} queries (budget {budget})'))
+                if verbose_queries:
+                    for query in ctx.captured_queries:
+                        self.stdout.write(f'    {query["sql"]}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: {used} queries (budget {budget})'))
+        return failures
@@ -0,0 +1,105 @@
+"""
+Management command to check that listing queries are served by indexes
+"""
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.perf import isolated_database, seed_catalog, api_client
+
+ORDERINGS = ('-created_at', 'price', '-price', 'name', '-discount')
+
+# (label, path, authenticated); every SELECT a route runs is explained, and
+# routes returning a `next` link have that page explained as well. Ranked
+# search is left out: bm25 ordering needs a sort by design.
+PLAN_ROUTES = [
+    ('category list', '/api/categories/', False),
+    ('category products', '/api/categories/{category.slug}/products/', False),
+    ('product detail', '/api/products/{product.slug}/', False),
+    ('current user', '/api/auth/user/', True),
+    ('address list', '/api/addresses/', True),
+    ('cart list', '/api/cart/', True),
+    ('order list', '/api/orders/', True),
+    ('order list (cursor)', '/api/orders/?cursor=', True),
+    ('order detail', '/api/orders/{order.pk}/', True),
+] + [
+    route
+    for ordering in ORDERINGS
+    for route in (
+        (f'product list ({ordering})', f'/api/products/?ordering={ordering}', False),
+        (f'product list (category, {ordering})',
+         f'/api/products/?category={{category.slug}}&ordering={ordering}', False),
+        (f'product list (cursor, {ordering})', f'/api/products/?cursor=&ordering={ordering}', False),
+        (f'product list (category, cursor, {ordering})',
+         f'/api/products/?category={{category.slug}}&cursor=&ordering={ordering}', False),
+    )
+]
+
+# A table read without any index, or a sort the index order could not provide
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def plan_problems(sql):
+    """Return the EXPLAIN QUERY PLAN lines of `sql` that indicate a scan or a sort"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    return [detail for detail in details if FULL_SCAN.match(detail) or TEMP_SORT in detail]
+
+
+class Command(BaseCommand):
+    help = 'Fails when an API query plan contains a full table scan or a temporary sort'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-queries', action='store_true', help='Print the SQL of failing queries')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Query plan checks use SQLite EXPLAIN QUERY PLAN output')
+
+        with isolated_database():
+            failures = self.check_plans(options['verbose_queries'])
+
+        if failures:
+            raise CommandError(f'{len(failures)} route(s) with unindexed queries: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All query plans use indexes'))
+
+    def check_plans(self, verbose_queries):
+        # Enough rows per category that cursor routes have a second page
+        seeded = seed_catalog(products_per_category=60)
+        anonymous = api_client()
+        authenticated = api_client(seeded['user'])
+
+        failures = []
+        for label, path, needs_auth in PLAN_ROUTES:
+            client = authenticated if needs_auth else anonymous
+            url = path.format(**seeded)
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+                body = response.json() if response.status_code < 400 else None
+                if isinstance(body, dict) and body.get('next'):
+                    response = client.get(body['next'])
+            queries = ctx.captured_queries
+
+            if response.status_code >= 400:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'{label}: HTTP {response.status_code}'))
+                continue
+
+            problems = []
+            for query in queries:
+                if query['sql'].lstrip().upper().startswith('SELECT'):
+                    problems.extend((query['sql'], detail) for detail in plan_problems(query['sql']))
+
+            if problems:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'{label}: {"; ".join(d for _, d in problems)}'))
+                if verbose_queries:
+                    for sql in dict.fromkeys(sql for sql, _ in problems):
+                        self.stdout.write(f'    {sql}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: {len(queries)} queries indexed'))
+        return failures
@@ -0,0 +1,142 @@
+"""
+Management command to verify primary/replica routing against two SQLite files
+"""
+import os
+import sqlite3
+import tempfile
+from collections import Counter
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, router, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from api.models import Product
+from api.perf import isolated_database, seed_catalog, api_client
+from api.replicas import PRIMARY, replica_reads
+
+REPLICAS = ('replica_a', 'replica_b')
+
+
+class Command(BaseCommand):
+    help = 'Copies a seeded database to two replica files and checks which one serves each request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=2000, help='Requests per distribution check')
+
+    def handle(self, *args, **options):
+        with isolated_database(), tempfile.TemporaryDirectory() as tmp:
+            seeded = seed_catalog()
+            self.attach_replicas(tmp)
+            try:
+                with override_settings(DATABASE_REPLICAS={alias: 1 for alias in REPLICAS}):
+                    failures = self.check_routing(seeded)
+                    failures += self.check_distribution(options['samples'])
+            finally:
+                self.detach_replicas()
+
+        if failures:
+            raise CommandError(f'{len(failures)} routing check(s) failed: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Replica routing behaves as configured'))
+
+    def attach_replicas(self, tmp):
+        connection.ensure_connection()
+        for alias in REPLICAS:
+            path = os.path.join(tmp, f'{alias}.sqlite3')
+            copy = sqlite3.connect(path)
+            connection.connection.backup(copy)
+            copy.close()
+            connections.settings[alias] = {**connection.settings_dict, 'NAME': path}
+
+    def detach_replicas(self):
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+    def served_by(self, request):
+        """Run `request` and return the aliases that answered queries on api tables"""
+        with ExitStack() as stack:
+            contexts = {
+                alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in (PRIMARY, *REPLICAS)
+            }
+            response = request()
+        if response is not None and response.status_code >= 400:
+            raise CommandError(f'HTTP {response.status_code}: {response.content[:200]!r}')
+        return {
+            alias for alias, ctx in contexts.items()
+            if any('"api_' in query['sql'] for query in ctx.captured_queries)
+        }
+
+    def check_routing(self, seeded):
+        anonymous = api_client()
+        authenticated = api_client(seeded['user'])
+        product = seeded['product']
+
+        def read_after_write():
+            with replica_reads():
+                Product.objects.filter(pk=product.pk).update(stock=5)
+                list(Product.objects.filter(pk=product.pk))
+
+        def read_in_transaction():
+            with replica_reads(), transaction.atomic():
+                list(Product.objects.filter(pk=product.pk))
+
+        checks = [
+            ('anonymous product list', lambda: anonymous.get('/api/products/'), 'replica'),
+            ('authenticated product list', lambda: authenticated.get('/api/products/?ordering=price'), 'replica'),
+            ('anonymous category list', lambda: anonymous.get('/api/categories/'), 'replica'),
+            ('authenticated cart list', lambda: authenticated.get('/api/cart/'), 'primary'),
+            ('cart add', lambda: authenticated.post(
+                '/api/cart/', {'product_id': product.pk, 'quantity': 1}, content_type='application/json'
+            ), 'primary'),
+            ('read after write', read_after_write, 'primary'),
+            ('read inside transaction', read_in_transaction, 'primary'),
+        ]
+
+        failures = []
+        for label, request, expected in checks:
+            aliases = self.served_by(request)
+            ok = aliases == {PRIMARY} if expected == 'primary' else bool(aliases) and PRIMARY not in aliases
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f'{label}: served by {", ".join(sorted(aliases)) or "nothing"} '
+                                    f'(expected {expected})'))
+            if not ok:
+                failures.append(label)
+
+        # The copies really are separate files: a primary-only change is not visible on them
+        Product.objects.filter(pk=product.pk).update(name='Renamed on primary')
+        name = anonymous.get(f'/api/products/{product.slug}/').json()['name']
+        if name == 'Renamed on primary':
+            failures.append('replica isolation')
+            self.stdout.write(self.style.ERROR('replica isolation: replica returned the primary-only change'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'replica isolation: replica still returns "{name}"'))
+        return failures
+
+    def check_distribution(self, samples):
+        failures = []
+        scenarios = [
+            ('round robin', 'round_robin', {'replica_a': 1, 'replica_b': 1}),
+            ('weighted 3:1', 'weighted', {'replica_a': 3, 'replica_b': 1}),
+        ]
+        for label, strategy, weights in scenarios:
+            with override_settings(DATABASE_REPLICA_STRATEGY=strategy, DATABASE_REPLICAS=weights):
+                counts = Counter()
+                for _ in range(samples):
+                    with replica_reads():
+                        counts[router.db_for_read(Product)] += 1
+
+            expected = {alias: samples * weight / sum(weights.values()) for alias, weight in weights.items()}
+            # Round robin is exact to within one; weighted choice gets a 5% tolerance
+            tolerance = 1 if strategy == 'round_robin' else samples * 0.05
+            ok = set(counts) == set(weights) and all(
+                abs(counts[alias] - expected[alias]) <= tolerance for alias in weights
+            )
+            shares = ', '.join(f'{alias} {counts[alias]}' for alias in weights)
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f'{label}: {shares} of {samples}'))
+            if not ok:
+                failures.append(label)
+        return failures
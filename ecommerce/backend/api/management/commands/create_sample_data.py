@@ -1,14 +1,37 @@
 """
 Management command to create sample data
 """
-from django.core.management.base import BaseCommand
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.cache import bump_catalog_version
 from api.models import Category, Product
+from api.search import get_search_backend
+from api.synthetic import CATEGORY_NAMES, Progress, SyntheticDataset
 
 
 class Command(BaseCommand):
-    help = 'Creates sample categories and products'
+    help = 'Creates sample categories and products, or a large synthetic dataset with --scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='store_true',
+                            help='Generate a synthetic dataset of the sizes below instead of the 8 sample products')
+        parser.add_argument('--seed', type=int, default=1, help='Same seed and sizes give the same rows')
+        parser.add_argument('--categories', type=int, default=40)
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--orders', type=int, default=50000)
+        parser.add_argument('--cart-share', type=float, default=0.25, help='Share of users with a non-empty cart')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk_create')
+        parser.add_argument('--end-date', type=datetime.fromisoformat, default=datetime(2026, 1, 1),
+                            help='Newest generated timestamp (ISO date); history spans two years before it')
 
     def handle(self, *args, **options):
+        if options['scale']:
+            return self.create_scaled(options)
+
         # Create Categories
         categories_data = [
             {'name': 'Electronics', 'slug': 'electronics', 'description': 'Latest gadgets and electronics'},
@@ -165,3 +188,34 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS('Sample data created successfully!'))
 
+    def create_scaled(self, options):
+        if options['categories'] < 1 or options['products'] < 1 or options['users'] < 1:
+            raise CommandError('--categories, --products and --users must be at least 1')
+        if (Category.objects.filter(name=f'{CATEGORY_NAMES[0]} 1').exists()
+                or User.objects.filter(username='shopper0000001').exists()):
+            raise CommandError('Synthetic data already exists; start from an empty database '
+                               '(python manage.py flush) to regenerate it')
+
+        end = options['end_date']
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=dt_timezone.utc)
+        progress = Progress(self.stdout.write)
+        dataset = SyntheticDataset(options['seed'], end, options['chunk_size'], progress)
+
+        self.stdout.write(f'Generating synthetic data with seed {options["seed"]}')
+        summary = dataset.generate(
+            options['categories'], options['products'], options['users'], options['orders'],
+            cart_share=options['cart_share'],
+        )
+
+        # bulk_create sends no signals, so refresh what the Product signals maintain
+        started = time.perf_counter()
+        get_search_backend().rebuild()
+        bump_catalog_version()
+        self.stdout.write(f'  search index rebuilt in {time.perf_counter() - started:.1f}s')
+
+        rows = sum(done for _, done, _ in summary)
+        seconds = sum(elapsed for _, _, elapsed in summary)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {rows:,} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)'
+        ))
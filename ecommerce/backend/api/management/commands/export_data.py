@@ -0,0 +1,45 @@
+"""
+Management command to export products, orders or order items as CSV or NDJSON
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import CHUNK_SIZE, DATASETS, FORMATS, ExportError, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Streams a dataset to a file or stdout in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        parser.add_argument('--output', default='-', help='File to write, or - for stdout')
+        parser.add_argument('--created-after', help='ISO date or datetime, inclusive')
+        parser.add_argument('--created-before', help='ISO date or datetime; a date includes that day')
+        parser.add_argument('--status', help='Comma-separated order statuses (orders, order-items)')
+        parser.add_argument('--category', help='Category slug (products)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            stream = stream_export(
+                options['dataset'], options['format'], chunk_size=options['chunk_size'],
+                created_after=options['created_after'], created_before=options['created_before'],
+                status=options['status'], category=options['category'],
+            )
+        except ExportError as error:
+            raise CommandError(str(error))
+
+        target = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        written = 0
+        try:
+            for piece in stream:
+                target.write(piece)
+                written += len(piece)
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
+
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written:,} bytes to {options["output"]}'))
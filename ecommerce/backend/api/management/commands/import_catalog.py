@@ -0,0 +1,64 @@
+"""
+Management command to import a product feed (CSV or JSON Lines)
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog_import import CatalogImporter, FeedError, detect_format, open_feed, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Streams a CSV/JSONL product feed, matched by slug, and writes only new or changed products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file (.csv, .jsonl, .ndjson, optionally .gz) or - for stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Required when reading stdin')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows compared and written per batch')
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Create categories the feed mentions but the database lacks')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            feed_format = options['format'] or detect_format(path)
+        except FeedError as error:
+            raise CommandError(str(error))
+
+        importer = CatalogImporter(
+            chunk_size=options['chunk_size'],
+            create_categories=options['create_categories'],
+            dry_run=options['dry_run'],
+        )
+        started = last_report = time.perf_counter()
+
+        def report(stats):
+            nonlocal last_report
+            now = time.perf_counter()
+            if now - last_report >= 1:
+                last_report = now
+                self.stdout.write(f'  {stats.rows:,} rows ({stats.rows / (now - started):,.0f} rows/s)')
+
+        try:
+            with open_feed(path) as handle:
+                stats = importer.run(read_rows(handle, feed_format), on_chunk=report)
+        except OSError as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+        elapsed = time.perf_counter() - started
+
+        for message in stats.errors:
+            self.stdout.write(self.style.WARNING(message))
+        if stats.invalid > len(stats.errors):
+            self.stdout.write(self.style.WARNING(f'... and {stats.invalid - len(stats.errors)} more invalid rows'))
+        if stats.ignored_columns:
+            self.stdout.write(self.style.WARNING(
+                f'Ignored unknown columns: {", ".join(sorted(map(str, stats.ignored_columns)))}'
+            ))
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{stats.rows:,} rows in {elapsed:.2f}s ({stats.rows / max(elapsed, 1e-9):,.0f} rows/s): '
+            f'{stats.inserted:,} inserted, {stats.updated:,} updated, {stats.unchanged:,} unchanged, '
+            f'{stats.invalid:,} invalid, {stats.categories_created:,} categories created'
+        ))
@@ -0,0 +1,14 @@
+"""
+Management command to delete expired idempotency keys
+"""
+from django.core.management.base import BaseCommand
+
+from api.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored Idempotency-Key responses whose TTL has passed'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(limit=None)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
@@ -0,0 +1,26 @@
+"""
+Management command to rebuild the product search index
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product full-text search index from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows inserted per batch')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        started = time.perf_counter()
+        with transaction.atomic():
+            total = backend.rebuild(chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} products with {type(backend).__name__} in {elapsed:.2f}s'
+        ))
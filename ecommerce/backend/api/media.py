@@ -0,0 +1,41 @@
+"""
+Content-hashed media names
+
+HashedFileSystemStorage puts a hash of each saved file's content in its name
+(products/shoe.jpg -> products/shoe.3f2a9c1b7e4d.jpg), the way
+ManifestStaticFilesStorage names static files. A hashed name never refers to
+other bytes, so shopvue.middleware serves it with a far-future immutable
+Cache-Control; other media gets MEDIA_MAX_AGE.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_LENGTH = 12
+# name.<hash>.ext, plus the _<random> suffix Storage adds when the name is taken
+HASHED_NAME = re.compile(r'\.[0-9a-f]{%d}(?:_[0-9A-Za-z]{7})?\.[^./]+$' % HASH_LENGTH)
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def is_hashed(name):
+    return HASHED_NAME.search(name) is not None
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        root, ext = posixpath.splitext(name)
+        return super().save(f'{root}.{content_hash(content)}{ext}', content, max_length=max_length)
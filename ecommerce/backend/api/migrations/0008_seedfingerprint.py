@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeedFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step', models.CharField(max_length=100, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('applied_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Seed Fingerprint',
+                'verbose_name_plural': 'Seed Fingerprints',
+            },
+        ),
+    ]
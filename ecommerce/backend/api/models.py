@@ -12,6 +12,8 @@ class Category(models.Model):
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    # Responsive sizes of `image` (see api/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -29,6 +31,8 @@ class Product(models.Model):
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField()
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Responsive sizes of `image` (see api/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     image_url = models.URLField(max_length=500, blank=True, null=True, help_text='External image URL')
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     original_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, validators=[MinValueValidator(0)])
@@ -43,6 +47,17 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Listings filter on is_active (and often category) and sort by one of
+        # ProductViewSet.ordering_fields; the implicit rowid suffix serves the id
+        # tie-break. Django renders is_active=True as a bare column test, which
+        # SQLite matches against a partial index condition but not an index column.
+        indexes = [
+            models.Index(fields=[field], condition=models.Q(is_active=True), name=f'product_active_{field}_idx')
+            for field in ('created_at', 'price', 'name', 'discount')
+        ] + [
+            models.Index(fields=['category', field], condition=models.Q(is_active=True), name=f'product_cat_{field}_idx')
+            for field in ('created_at', 'price', 'name', 'discount')
+        ]
 
     def __str__(self):
         return self.name
@@ -80,6 +95,9 @@ class Address(models.Model):
         verbose_name = "Address"
         verbose_name_plural = "Addresses"
         ordering = ['-is_default', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_default', 'created_at'], name='address_user_default_idx'),
+        ]
 
     def __str__(self):
         return f"{self.full_name} - {self.city}, {self.country}"
@@ -102,6 +120,9 @@ class CartItem(models.Model):
     class Meta:
         unique_together = ['user', 'product']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='cartitem_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name} x{self.quantity}"
@@ -139,6 +160,9 @@ class Order(models.Model):
         verbose_name = "Order"
         verbose_name_plural = "Orders"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number} - {self.user.username}"
@@ -166,3 +190,35 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.order.order_number} - {self.product_name} x{self.quantity}"
 
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of an unsafe request sent with an Idempotency-Key header"""
+    scope = models.CharField(max_length=64)  # "user:<id>" or "anonymous:<request hash>"
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # null while in progress
+    response_body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ['scope', 'key']
+        verbose_name = "Idempotency Key"
+        verbose_name_plural = "Idempotency Keys"
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+
+class SeedFingerprint(models.Model):
+    """Fingerprint of a seed command as of its last successful run by `boot`"""
+    step = models.CharField(max_length=100, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    applied_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Seed Fingerprint"
+        verbose_name_plural = "Seed Fingerprints"
+
+    def __str__(self):
+        return f"{self.step} {self.fingerprint[:12]}"
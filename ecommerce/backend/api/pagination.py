@@ -0,0 +1,207 @@
+"""
+API pagination
+
+StandardPagination behaves exactly like DRF's PageNumberPagination unless the
+client sends a `cursor` query parameter (empty for the first page). In that
+mode it switches to keyset pagination: rows are ordered by the active
+ordering plus the primary key, and the next page is fetched with a WHERE
+clause on the last row's values instead of an OFFSET, so page 500 costs the
+same as page 1.
+
+The async catalog views (async_views.py) use apaginate_queryset, which runs
+the same steps with awaited counts and row fetches.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+# Upper bound for ?count=estimate; beyond this the count is reported as a floor
+COUNT_ESTIMATE_CAP = 10000
+
+
+def encode_cursor(values):
+    payload = json.dumps(values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(values, list):
+        raise NotFound('Invalid cursor')
+    return values
+
+
+def resolve_attr(obj, path):
+    if isinstance(obj, dict):
+        # .values() rows
+        return obj['id' if path == 'pk' else path]
+    for part in path.split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def lookup_field(model, path):
+    """The model field at the end of a `__` path, or None (e.g. for annotations)"""
+    field = None
+    for part in path.split('__'):
+        if model is None:
+            return None
+        try:
+            field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        model = field.related_model
+    return field
+
+
+class StandardPagination(PageNumberPagination):
+    """Page-number pagination with opt-in keyset (cursor) mode"""
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = (
+            self.cursor_query_param in request.query_params
+            and isinstance(queryset, QuerySet)
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_keyset(queryset, request)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+
+        body = OrderedDict()
+        if self.count is not None:
+            body['count'] = self.count
+            body['count_is_estimate'] = self.count_is_estimate
+        body['next'] = self.next_link
+        body['results'] = data
+        return Response(body)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            # Tie-break on the primary key in the direction of the leading field
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def paginate_keyset(self, queryset, request):
+        self.count, self.count_is_estimate = self.get_count(queryset, request)
+        window = self.keyset_window(queryset, request)
+        return self.keyset_page(list(window), request)
+
+    def keyset_window(self, queryset, request):
+        """The ordered, filtered queryset slice holding the page plus one row"""
+        self.window_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+        self.keyset_fields = [field.lstrip('-') for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(ordering):
+                raise NotFound('Cursor does not match the requested ordering')
+            try:
+                values = self.cursor_values(queryset.model, values)
+                queryset = queryset.filter(self.after(ordering, values))
+            except (TypeError, ValidationError, ValueError):
+                # A tampered cursor must not reach the database as a bad lookup
+                raise NotFound('Invalid cursor')
+        return queryset[:self.window_size + 1]
+
+    def keyset_page(self, rows, request):
+        self.request = request
+        has_next = len(rows) > self.window_size
+        rows = rows[:self.window_size]
+
+        self.next_link = None
+        if has_next:
+            last = rows[-1]
+            next_cursor = encode_cursor([resolve_attr(last, field) for field in self.keyset_fields])
+            url = request.build_absolute_uri()
+            url = remove_query_param(url, self.page_query_param)
+            self.next_link = replace_query_param(url, self.cursor_query_param, next_cursor)
+        return rows
+
+    def cursor_values(self, model, values):
+        """The cursor's values converted by the model fields they sort on"""
+        converted = []
+        for name, value in zip(self.keyset_fields, values):
+            field = lookup_field(model, name)
+            converted.append(value if field is None or value is None else field.to_python(value))
+        return converted
+
+    def after(self, ordering, values):
+        """WHERE clause selecting rows that sort strictly after `values`"""
+        condition = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            branch = Q(**{f'{name}__{lookup}': values[i]})
+            for previous, value in zip(ordering[:i], values[:i]):
+                branch &= Q(**{previous.lstrip('-'): value})
+            condition |= branch
+        return condition
+
+    def get_count(self, queryset, request):
+        """Counts are opt-in in cursor mode: ?count=exact or ?count=estimate"""
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count(), False
+        if mode == 'estimate':
+            count = queryset.order_by()[:COUNT_ESTIMATE_CAP].count()
+            return count, count >= COUNT_ESTIMATE_CAP
+        return None, False
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views; querysets are counted and fetched without blocking"""
+        if not isinstance(queryset, QuerySet):
+            # e.g. SearchResults, which only has a synchronous interface
+            return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if self.cursor_mode:
+            self.count, self.count_is_estimate = await self.aget_count(queryset, request)
+            window = self.keyset_window(queryset, request)
+            return self.keyset_page([row async for row in window], request)
+
+        # PageNumberPagination.paginate_queryset with the count primed up front
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+    async def aget_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return await queryset.acount(), False
+        if mode == 'estimate':
+            count = await queryset.order_by()[:COUNT_ESTIMATE_CAP].acount()
+            return count, count >= COUNT_ESTIMATE_CAP
+        return None, False
@@ -0,0 +1,103 @@
+"""
+Helpers shared by the performance management commands
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+
+from .authentication import ClaimsRefreshToken
+from .models import Category, Product, Address, CartItem, Order, OrderItem
+from .search import get_search_backend
+
+
+# Keeps throwaway runs from reading or polluting the shared catalog cache
+ISOLATED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'perf-default'},
+    'catalog': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'perf-catalog'},
+}
+
+
+@contextmanager
+def isolated_database():
+    """Run the block against a freshly migrated throwaway database"""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(CACHES=ISOLATED_CACHES, DATABASE_REPLICAS={}):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_catalog(categories=4, products_per_category=25, cart_items=20,
+                 orders=20, items_per_order=5):
+    """Create a small but representative catalog plus one shopper"""
+    category_objs = Category.objects.bulk_create([
+        Category(name=f'Category {c}', slug=f'category-{c}', description=f'Category {c}')
+        for c in range(categories)
+    ])
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'Product {c}-{p}',
+            slug=f'product-{c}-{p}',
+            description=f'Description for product {c}-{p}',
+            price=Decimal('10.00') + p,
+            original_price=Decimal('20.00') + p if p % 3 == 0 else None,
+            discount=(p * 7) % 50,
+            category=category,
+            stock=100,
+            rating=Decimal('4.00'),
+            reviews_count=p,
+        )
+        for c, category in enumerate(category_objs)
+        for p in range(products_per_category)
+    ])
+    # bulk_create skips post_save, so index the new rows in one pass
+    get_search_backend().rebuild()
+
+    user = User.objects.create_user(
+        username='perf-shopper', email='perf@shopvue.com', password='perf-pass-123'
+    )
+    address = Address.objects.create(
+        user=user, full_name='Perf Shopper', phone='0000', address='1 Main St',
+        city='Kuwait City', state='Capital', zip_code='00000', is_default=True,
+    )
+    CartItem.objects.bulk_create([
+        CartItem(user=user, product=product, quantity=1)
+        for product in products[:cart_items]
+    ])
+    for o in range(orders):
+        order = Order.objects.create(
+            user=user, delivery_address=address, subtotal=0, total=0,
+            payment_method='cash',
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product=product, product_name=product.name,
+                quantity=1, price=product.price, total=product.price,
+            )
+            for product in products[o:o + items_per_order]
+        ])
+    return {
+        'user': user,
+        'category': category_objs[0],
+        'product': products[0],
+        'order': Order.objects.filter(user=user).first(),
+    }
+
+
+def api_client(user=None):
+    """Django test client, authenticated with a JWT when a user is given"""
+    extra = {'HTTP_HOST': 'localhost'}
+    if user is not None:
+        token = ClaimsRefreshToken.for_user(user).access_token
+        extra['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return Client(**extra)
@@ -0,0 +1,103 @@
+"""
+Fast JSON and MessagePack renderers and parsers
+
+JSONRenderer and JSONParser are drop-in replacements for REST framework's that
+encode and decode with orjson when it is installed, and fall back to REST
+framework's stdlib implementation otherwise, or for anything orjson does not
+do the same way (indented output, non-UTF-8 bodies, integers beyond 64 bits:
+orjson would read those back as floats, so bodies with a 19+ digit run parse
+with the stdlib).
+Output is byte-for-byte what REST framework would send: values other than
+str/int/float/bool/None/list/dict (datetimes, raw Decimals, lazy strings...)
+go through REST framework's own JSONEncoder.default, and U+2028/U+2029 are
+escaped the same way.
+
+With msgpack installed, settings.py adds MessagePackRenderer/Parser, so a
+client sending `Accept: application/msgpack` gets the same data as compact
+MessagePack, and may send it as a request body too.
+"""
+import io
+import re
+
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# REST framework's conversions for everything a serializer may leave unconverted
+encode_default = JSONEncoder().default
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+UTF8 = ('utf-8', 'utf8')
+# Every integer outside int64/uint64 has at least 19 digits (-9223372036854775809)
+LONG_DIGITS_RE = re.compile(rb'\d{19}')
+
+if orjson is not None:
+    # Datetimes go to encode_default for REST framework's format ('Z', not '+00:00')
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # orjson only writes compact UTF-8, REST framework's default
+        fallback = orjson is None or data is None or self.ensure_ascii or not self.compact
+        if fallback or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in content:
+                content = content.replace(raw, escaped)
+        return content
+
+
+class JSONParser(parsers.JSONParser):
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        # orjson rejects NaN/Infinity, so it only stands in for a strict parser
+        if orjson is None or not self.strict or encoding.lower() not in UTF8:
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if LONG_DIGITS_RE.search(body):
+            # Possibly an integer orjson would turn into a float; the stdlib keeps it exact
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % (str(exc) or type(exc).__name__))
@@ -0,0 +1,122 @@
+"""
+Primary/replica database routing
+
+ReplicaRoutingMiddleware allows replica reads for safe-method requests that
+are anonymous or dispatched to a view with `replica_reads = True` (the
+read-only catalog viewsets and async views). Within such a request ReplicaRouter sends reads
+to one replica, chosen once per request from settings.DATABASE_REPLICAS
+(alias -> weight) by DATABASE_REPLICA_STRATEGY: 'round_robin' or 'weighted'.
+The first routed write pins the rest of the request to the primary, as does
+an open transaction on it. Auth and session rows are always read from the
+primary so password changes and deactivations take effect immediately.
+Everything outside a request (commands, shell, signals) uses the primary.
+"""
+import contextvars
+import itertools
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = DEFAULT_DB_ALIAS
+PRIMARY_ONLY_APPS = frozenset({'auth', 'sessions', 'contenttypes', 'admin'})
+
+_state = contextvars.ContextVar('replica_routing', default=None)
+_round_robin = itertools.count()
+
+
+class RoutingState:
+    """Per-request routing decision; mutable so it survives context copies"""
+    __slots__ = ('replica_reads', 'wrote', 'alias')
+
+    def __init__(self, replica_reads):
+        self.replica_reads = replica_reads
+        self.wrote = False
+        self.alias = None
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', None) or {}
+
+
+def choose_replica():
+    replicas = get_replicas()
+    if not replicas:
+        return PRIMARY
+    aliases = list(replicas)
+    if getattr(settings, 'DATABASE_REPLICA_STRATEGY', 'round_robin') == 'weighted':
+        return random.choices(aliases, weights=[replicas[alias] for alias in aliases])[0]
+    return aliases[next(_round_robin) % len(aliases)]
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """Route the block like one request, with replica reads allowed or not"""
+    token = _state.set(RoutingState(allowed))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    """Send eligible reads to a replica and every write to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_reads or state.wrote:
+            return PRIMARY
+        if model._meta.app_label in PRIMARY_ONLY_APPS or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        if state.alias is None:
+            state.alias = choose_replica()
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
+
+
+class ReplicaRoutingMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.is_anonymous_read(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with replica_reads(self.is_anonymous_read(request)):
+            return await self.get_response(request)
+
+    def is_anonymous_read(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Viewsets carry the flag on their class, async views on the function
+        view = getattr(view_func, 'cls', view_func)
+        if request.method in SAFE_METHODS and getattr(view, 'replica_reads', False):
+            _state.get().replica_reads = True
@@ -0,0 +1,248 @@
+"""
+Product search index
+
+The active backend is chosen with the PRODUCT_SEARCH_BACKEND setting. On SQLite
+we keep an FTS5 table in the same database; other databases fall back to a
+ranked LIKE search so the API behaves the same everywhere.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+FTS_TABLE = 'api_product_fts'
+
+# BM25 column weights: a hit in the name counts ten times a hit in the description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split a user query into lowercase word tokens"""
+    return TOKEN_RE.findall(query.lower())
+
+
+class SearchResults:
+    """
+    Lazy, sliceable view over ranked search hits.
+
+    Django's paginator only needs count() and slicing, so each page runs one
+    LIMIT/OFFSET query against the index instead of materializing every hit.
+    With a `scope` queryset, hits are limited to its products before ranking,
+    so counts and pages agree with the filters the caller hydrates with.
+    """
+
+    def __init__(self, backend, query, scope=None):
+        self.backend = backend
+        self.query = query
+        self.scope = scope
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query, scope=self.scope)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            limit = None if key.stop is None else max(key.stop - start, 0)
+            return self.backend.search(self.query, limit=limit, offset=start, scope=self.scope)
+        return self.backend.search(self.query, limit=1, offset=key, scope=self.scope)[0]
+
+
+class BaseSearchBackend:
+    """Interface every product search backend implements"""
+
+    def index(self, product):
+        raise NotImplementedError
+
+    def index_many(self, products):
+        """Refresh many entries at once (bulk writes send no signals)"""
+        for product in products:
+            self.index(product)
+
+    def remove(self, product_id):
+        raise NotImplementedError
+
+    def rebuild(self, queryset=None, chunk_size=2000):
+        raise NotImplementedError
+
+    def search(self, query, limit=None, offset=0, scope=None):
+        """Return ranked product ids for the query, within the `scope` queryset if given"""
+        raise NotImplementedError
+
+    def count(self, query, scope=None):
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, query):
+        """Restrict a Product queryset to matches (unranked)"""
+        raise NotImplementedError
+
+    def results(self, query, scope=None):
+        return SearchResults(self, query, scope)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """FTS5 index with prefix matching and BM25 ranking"""
+
+    def match_expression(self, query):
+        # Every token must match, each as a prefix so "head" finds "headphones"
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def match_clause(self, expression, scope):
+        """WHERE clause and params for hits of `expression` among the `scope` products"""
+        where, params = f'{FTS_TABLE} MATCH %s', [expression]
+        if scope is not None:
+            sql, scope_params = scope.order_by().values('pk').query.sql_with_params()
+            where += f' AND rowid IN ({sql})'
+            params += scope_params
+        return where, params
+
+    def index(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+            if product.is_active:
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)',
+                    [product.pk, product.name, product.description]
+                )
+
+    def index_many(self, products):
+        products = list(products)
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[p.pk] for p in products])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)',
+                [[p.pk, p.name, p.description] for p in products if p.is_active]
+            )
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+    def rebuild(self, queryset=None, chunk_size=2000):
+        from .models import Product
+
+        if queryset is None:
+            queryset = Product.objects.filter(is_active=True)
+        rows = queryset.values_list('pk', 'name', 'description')
+
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            batch = []
+            for row in rows.iterator(chunk_size=chunk_size):
+                batch.append(row)
+                if len(batch) >= chunk_size:
+                    cursor.executemany(
+                        f'INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)', batch
+                    )
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (%s, %s, %s)', batch
+                )
+                total += len(batch)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        return total
+
+    def search(self, query, limit=None, offset=0, scope=None):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        where, params = self.match_clause(expression, scope)
+        sql = (
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {where} '
+            f'ORDER BY bm25({FTS_TABLE}, %s, %s), rowid LIMIT %s OFFSET %s'
+        )
+        params += [NAME_WEIGHT, DESCRIPTION_WEIGHT, -1 if limit is None else limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, query, scope=None):
+        expression = self.match_expression(query)
+        if not expression:
+            return 0
+        where, params = self.match_clause(expression, scope)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {where}', params)
+            return cursor.fetchone()[0]
+
+    def filter_queryset(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]
+        ))
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Portable fallback: LIKE matching, name hits ranked above description hits"""
+
+    def index(self, product):
+        pass
+
+    def index_many(self, products):
+        pass
+
+    def remove(self, product_id):
+        pass
+
+    def rebuild(self, queryset=None, chunk_size=2000):
+        return 0
+
+    def _matches(self, query, scope=None):
+        from .models import Product
+
+        products = Product.objects.all() if scope is None else scope
+        tokens = tokenize(query)
+        if not tokens:
+            return products.none()
+        condition = Q()
+        for token in tokens:
+            condition &= Q(name__icontains=token) | Q(description__icontains=token)
+        return products.filter(condition, is_active=True)
+
+    def search(self, query, limit=None, offset=0, scope=None):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        name_hit = Q()
+        for token in tokens:
+            name_hit &= Q(name__icontains=token)
+        ranked = self._matches(query, scope).annotate(
+            search_rank=Case(When(name_hit, then=Value(0)), default=Value(1), output_field=IntegerField())
+        ).order_by('search_rank', 'pk').values_list('pk', flat=True)
+        end = None if limit is None else offset + limit
+        return list(ranked[offset:end])
+
+    def count(self, query, scope=None):
+        return self._matches(query, scope).count()
+
+    def filter_queryset(self, queryset, query):
+        if not tokenize(query):
+            return queryset
+        return queryset.filter(pk__in=self._matches(query).values('pk'))
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseSearchBackend()
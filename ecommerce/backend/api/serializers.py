@@ -1,43 +1,68 @@
 """
 API Serializers for converting models to JSON
 """
+from operator import itemgetter
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from .fieldsets import EVERYTHING, SparseFieldsMixin
+from .images import image_srcset, resized_srcset
 from .models import Category, Product, Address, CartItem, Order, OrderItem
 
+# Default category images, used when no image has been uploaded
+CATEGORY_DEFAULT_IMAGES = {
+    'electronics': 'https://images.unsplash.com/photo-1498049794561-7780e7231661?w=800&h=600&fit=crop&q=80',
+    'clothing': 'https://images.unsplash.com/photo-1445205170230-053b83016050?w=800&h=600&fit=crop&q=80',
+    'home-garden': 'https://images.unsplash.com/photo-1586023492125-27b2c045efd7?w=800&h=600&fit=crop&q=80',
+    'sports': 'https://images.unsplash.com/photo-1571019613454-1cb2f99b2d8b?w=800&h=600&fit=crop&q=80',
+    'books': 'https://images.unsplash.com/photo-1544947950-fa07a98d237f?w=800&h=600&fit=crop&q=80',
+    'toys-games': 'https://images.unsplash.com/photo-1558618666-fcd25c85cd64?w=800&h=600&fit=crop&q=80',
+    'beauty-health': 'https://images.unsplash.com/photo-1522338242992-e1a54906a8da?w=800&h=600&fit=crop&q=80',
+    'automotive': 'https://images.unsplash.com/photo-1492144534655-ae79c964c9d7?w=800&h=600&fit=crop&q=80',
+}
+CATEGORY_PLACEHOLDER_IMAGE = 'https://via.placeholder.com/800x600?text=Category'
+PRODUCT_PLACEHOLDER_IMAGE = 'https://via.placeholder.com/400x300?text={name}'
+
+
+def file_url_builder(storage, request):
+    """Storage name -> URL, absolute when there is a request, as DRF's ImageField renders it"""
+    if request is not None:
+        return lambda name: request.build_absolute_uri(storage.url(name))
+    return storage.url
+
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Category Serializer"""
+    image_srcset = serializers.SerializerMethodField()
+    field_columns = {'image': ('image', 'slug'), 'image_srcset': ('image', 'image_variants', 'slug')}
+
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'description', 'image', 'created_at']
+        fields = ['id', 'name', 'slug', 'description', 'image', 'image_srcset', 'created_at']
+
+    def get_image_srcset(self, instance):
+        """{format: srcset} of responsive sizes of `image`, or null"""
+        if instance.image:
+            url = file_url_builder(instance.image.storage, self.context.get('request'))
+            return image_srcset(instance.image_variants, instance.image.name, url)
+        return resized_srcset(CATEGORY_DEFAULT_IMAGES.get(instance.slug))
     
     def to_representation(self, instance):
         """Override to provide default image if none exists"""
         representation = super().to_representation(instance)
-        # Map category slugs to default images if no image is set
-        category_images = {
-            'electronics': 'https://images.unsplash.com/photo-1498049794561-7780e7231661?w=800&h=600&fit=crop&q=80',
-            'clothing': 'https://images.unsplash.com/photo-1445205170230-053b83016050?w=800&h=600&fit=crop&q=80',
-            'home-garden': 'https://images.unsplash.com/photo-1586023492125-27b2c045efd7?w=800&h=600&fit=crop&q=80',
-            'sports': 'https://images.unsplash.com/photo-1571019613454-1cb2f99b2d8b?w=800&h=600&fit=crop&q=80',
-            'books': 'https://images.unsplash.com/photo-1544947950-fa07a98d237f?w=800&h=600&fit=crop&q=80',
-            'toys-games': 'https://images.unsplash.com/photo-1558618666-fcd25c85cd64?w=800&h=600&fit=crop&q=80',
-            'beauty-health': 'https://images.unsplash.com/photo-1522338242992-e1a54906a8da?w=800&h=600&fit=crop&q=80',
-            'automotive': 'https://images.unsplash.com/photo-1492144534655-ae79c964c9d7?w=800&h=600&fit=crop&q=80',
-        }
-        
+        if 'image' not in representation:
+            return representation
         # If no image uploaded, use default from mapping
-        if not representation.get('image') and instance.slug in category_images:
-            representation['image'] = category_images[instance.slug]
+        if not representation.get('image') and instance.slug in CATEGORY_DEFAULT_IMAGES:
+            representation['image'] = CATEGORY_DEFAULT_IMAGES[instance.slug]
         elif not representation.get('image'):
-            representation['image'] = 'https://via.placeholder.com/800x600?text=Category'
+            representation['image'] = CATEGORY_PLACEHOLDER_IMAGE
         
         return representation
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Product Serializer"""
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
@@ -46,19 +71,36 @@ class ProductSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
+    image_srcset = serializers.SerializerMethodField()
+    expandable_fields = {'category': False}
+    field_columns = {
+        'image': ('image', 'image_url', 'name'),
+        'image_srcset': ('image', 'image_url', 'image_variants'),
+    }
 
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'slug', 'description', 'image', 'image_url', 'price',
+            'id', 'name', 'slug', 'description', 'image', 'image_srcset', 'image_url', 'price',
             'original_price', 'discount', 'category', 'category_id',
             'stock', 'rating', 'reviews_count', 'is_active', 'created_at'
         ]
         read_only_fields = ['rating', 'reviews_count']
+
+    def get_image_srcset(self, instance):
+        """{format: srcset} of responsive sizes of the image shown, or null"""
+        if instance.image_url:
+            return resized_srcset(instance.image_url)
+        if instance.image:
+            url = file_url_builder(instance.image.storage, self.context.get('request'))
+            return image_srcset(instance.image_variants, instance.image.name, url)
+        return None
     
     def to_representation(self, instance):
         """Override to use image_url if available, otherwise use image"""
         representation = super().to_representation(instance)
+        if 'image' not in representation:
+            return representation
         # Use image_url if available, otherwise use image field
         if instance.image_url:
             representation['image'] = instance.image_url
@@ -76,12 +118,165 @@ class ProductSerializer(serializers.ModelSerializer):
         # If image is None or empty, use a placeholder based on product name
         if not representation.get('image'):
             # Generate a placeholder with product name
-            product_name = representation.get('name', 'Product')
-            representation['image'] = f'https://via.placeholder.com/400x300?text={product_name.replace(" ", "+")}'
+            product_name = instance.name or 'Product'
+            representation['image'] = PRODUCT_PLACEHOLDER_IMAGE.format(name=product_name.replace(' ', '+'))
         
         return representation
 
 
+# Readable fields, in output order
+CATEGORY_FIELDS = CategorySerializer.Meta.fields
+PRODUCT_FIELDS = [field for field in ProductSerializer.Meta.fields if field != 'category_id']
+
+
+class CatalogRowSerializer:
+    """
+    Read-only fast path for catalog listings.
+
+    Works on `.values(*serializer.product_columns())` /
+    `.values(*serializer.category_columns())` rows and produces exactly the
+    same output as ProductSerializer and CategorySerializer (with the same
+    FieldPlan), without per-row DRF field machinery. The plan is compiled once
+    into a getter per rendered field. Each category is serialized once per
+    response and reused by all of its products.
+    """
+    # Reused DRF fields so number and date formatting cannot drift
+    price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+    rating_field = serializers.DecimalField(max_digits=3, decimal_places=2)
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, request=None, plan=None):
+        self.request = request
+        self.plan = plan or EVERYTHING
+        self.categories = {}
+        self.getters = {}
+        self.product_url = file_url_builder(Product._meta.get_field('image').storage, request)
+        self.category_url = file_url_builder(Category._meta.get_field('image').storage, request)
+
+    def datetime(self, value):
+        return self.datetime_field.to_representation(value) if value else None
+
+    def category_plan(self, prefix):
+        return self.plan.child('category') if prefix else self.plan
+
+    def category_names(self, prefix=''):
+        plan = self.category_plan(prefix)
+        plan.check(CATEGORY_FIELDS, prefix.replace('__', '.'))
+        return [name for name in CATEGORY_FIELDS if plan.allows(name)]
+
+    def category_columns(self, prefix=''):
+        """values() columns for the category fields rendered (nested under products with a prefix)"""
+        columns = {'category_id'} if prefix else {'id'}
+        for name in self.category_names(prefix):
+            columns.update(prefix + column for column in CategorySerializer.field_columns.get(name, (name,)))
+        return sorted(columns)
+
+    def category_getters(self, prefix):
+        getters = self.getters.get(prefix)
+        if getters is not None:
+            return getters
+
+        def image(row):
+            name = row[f'{prefix}image']
+            if name:
+                return self.category_url(name)
+            return CATEGORY_DEFAULT_IMAGES.get(row[f'{prefix}slug'], CATEGORY_PLACEHOLDER_IMAGE)
+
+        def srcset(row):
+            name = row[f'{prefix}image']
+            if name:
+                return image_srcset(row[f'{prefix}image_variants'], name, self.category_url)
+            return resized_srcset(CATEGORY_DEFAULT_IMAGES.get(row[f'{prefix}slug']))
+
+        computed = {
+            'id': itemgetter('category_id' if prefix else 'id'),
+            'image': image,
+            'image_srcset': srcset,
+            'created_at': lambda row: self.datetime(row[f'{prefix}created_at']),
+        }
+        getters = self.getters[prefix] = [
+            (name, computed.get(name) or itemgetter(prefix + name)) for name in self.category_names(prefix)
+        ]
+        return getters
+
+    def category(self, row, prefix=''):
+        pk = row['category_id'] if prefix else row['id']
+        if pk is None:
+            return None
+        cached = self.categories.get(pk)
+        if cached is not None:
+            return cached
+        data = self.categories[pk] = {name: get(row) for name, get in self.category_getters(prefix)}
+        return data
+
+    def product_names(self):
+        self.plan.check(PRODUCT_FIELDS)
+        return [name for name in PRODUCT_FIELDS if self.plan.allows(name)]
+
+    def product_columns(self, *extra):
+        """values() columns for the product fields rendered, plus `extra` (e.g. sort keys for cursors)"""
+        columns = {'id', *extra}
+        for name in self.product_names():
+            if name == 'category':
+                columns.add('category_id')
+                if self.plan.expands('category'):
+                    columns.update(self.category_columns('category__'))
+            else:
+                columns.update(ProductSerializer.field_columns.get(name, (name,)))
+        return sorted(columns)
+
+    def product_getters(self):
+        getters = self.getters.get('product')
+        if getters is not None:
+            return getters
+
+        def image(row):
+            if row['image_url']:
+                return row['image_url']
+            if row['image']:
+                return self.product_url(row['image'])
+            return PRODUCT_PLACEHOLDER_IMAGE.format(name=row['name'].replace(' ', '+'))
+
+        def srcset(row):
+            if row['image_url']:
+                return resized_srcset(row['image_url'])
+            if row['image']:
+                return image_srcset(row['image_variants'], row['image'], self.product_url)
+            return None
+
+        def original_price(row):
+            value = row['original_price']
+            return None if value is None else self.price_field.to_representation(value)
+
+        def category(row):
+            return self.category(row, prefix='category__')
+
+        if not self.plan.expands('category'):
+            category = itemgetter('category_id')
+        computed = {
+            'image': image,
+            'image_srcset': srcset,
+            'price': lambda row: self.price_field.to_representation(row['price']),
+            'original_price': original_price,
+            'category': category,
+            'rating': lambda row: self.rating_field.to_representation(row['rating']),
+            'created_at': lambda row: self.datetime(row['created_at']),
+        }
+        getters = self.getters['product'] = [
+            (name, computed.get(name) or itemgetter(name)) for name in self.product_names()
+        ]
+        return getters
+
+    def product(self, row):
+        return {name: get(row) for name, get in self.product_getters()}
+
+    def products(self, rows):
+        return [self.product(row) for row in rows]
+
+    def category_list(self, rows):
+        return [self.category(row) for row in rows]
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User Serializer"""
     class Meta:
@@ -117,7 +312,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Address Serializer"""
     class Meta:
         model = Address
@@ -129,7 +324,7 @@ class AddressSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Cart Item Serializer"""
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
@@ -138,6 +333,8 @@ class CartItemSerializer(serializers.ModelSerializer):
         write_only=True
     )
     total_price = serializers.ReadOnlyField()
+    expandable_fields = {'product': False}
+    field_columns = {'total_price': ('quantity', 'product__price')}
 
     class Meta:
         model = CartItem
@@ -145,14 +342,41 @@ class CartItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class CartOperationSerializer(serializers.Serializer):
+    """One operation of a batch cart update"""
+    OPERATIONS = ['add', 'set', 'remove', 'clear']
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    product_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'clear' and 'product_id' not in attrs:
+            raise serializers.ValidationError({"product_id": "This field is required."})
+        if attrs['op'] == 'add':
+            attrs.setdefault('quantity', 1)
+            if attrs['quantity'] < 1:
+                raise serializers.ValidationError({"quantity": "Must be at least 1 when adding."})
+        if attrs['op'] == 'set' and 'quantity' not in attrs:
+            raise serializers.ValidationError({"quantity": "This field is required."})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Batch cart update: operations are applied in order"""
+    operations = serializers.ListField(
+        child=CartOperationSerializer(), allow_empty=False, max_length=500
+    )
+
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Order Item Serializer"""
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'quantity', 'price', 'total']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Order Serializer"""
     items = OrderItemSerializer(many=True, read_only=True)
     delivery_address = AddressSerializer(read_only=True)
@@ -162,6 +386,7 @@ class OrderSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
+    expandable_fields = {'delivery_address': False, 'items': True}
 
     class Meta:
         model = Order
@@ -0,0 +1,53 @@
+"""
+Model signal handlers that keep derived data in sync
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .cache import bump_catalog_version_on_commit
+from .images import needs_derivatives, schedule_derivatives
+from .models import Category, Product
+from .search import get_search_backend
+from .snapshots import product_deleted, product_saved
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    """Refresh the search index entry and in-memory snapshots for a saved product"""
+    if raw:
+        return
+    get_search_backend().index(instance)
+    product_saved(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    """Drop a deleted product from the search index and in-memory snapshots"""
+    get_search_backend().remove(instance.pk)
+    product_deleted(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Any catalog write makes cached catalog responses stale"""
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def refresh_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Build responsive sizes of a new or changed image, off the request path"""
+    if not raw and needs_derivatives(instance):
+        schedule_derivatives(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_verified_user(sender, instance, **kwargs):
+    """Re-check token fingerprints after a password, active or staff change"""
+    forget_user(instance.pk)
@@ -0,0 +1,136 @@
+"""
+Per-process in-memory snapshots of the active products
+
+Some read paths (suggestions, facet counts) answer from a structure built
+from Product rows instead of querying. A LiveSnapshot builds that structure on
+first use in each process and keeps it current:
+
+- saves and deletes in this process are applied after commit (see signals.py);
+- writes from other processes, and bulk writes, which send no signals, are
+  found by checking the catalog version at most once per `ttl_setting`
+  seconds. When it changed, rows with a newer updated_at are applied; only
+  products deleted elsewhere, which leave no row behind, and more than
+  SNAPSHOT_REBUILD_ROWS changed rows (e.g. after import_catalog) force a
+  rebuild, which happens off the lock and is swapped in.
+
+The structure is built from (pk, *fields) rows of active products and
+implements add(pk, *fields), remove(pk) and __len__, and optionally
+update(rows, removed_pks) to apply a batch in one pass. Readers hold
+`snapshot.lock` while they use it, as updates happen in place.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import get_catalog_version
+
+# Re-read rows saved this long before the last sync, in case they committed after it
+SYNC_OVERLAP = timedelta(minutes=1)
+# Above this many changed rows a catch-up rebuilds instead of applying them under the lock
+DEFAULT_REBUILD_ROWS = 2000
+
+_snapshots = []
+
+
+class LiveSnapshot:
+    def __init__(self, structure, fields, ttl_setting):
+        self.structure = structure
+        self.fields = tuple(fields)
+        self.ttl_setting = ttl_setting
+        self.lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.current = None
+        self.version = None
+        self.synced_at = None
+        self.checked_at = 0.0
+        _snapshots.append(self)
+
+    def rows(self, *extra_fields, **filters):
+        from .models import Product
+
+        return Product.objects.filter(**filters).values_list('pk', *self.fields, *extra_fields)
+
+    def fresh(self):
+        """The structure if it can be used without database or cache access, else None"""
+        ttl = getattr(settings, self.ttl_setting, 30)
+        if self.current is not None and time.monotonic() - self.checked_at < ttl:
+            return self.current
+        return None
+
+    def get(self):
+        """The structure, built or caught up first if it is due"""
+        current = self.fresh()
+        if current is not None:
+            return current
+        # Readers keep using the current structure while it is refreshed
+        with self._refresh_lock:
+            if self.fresh() is None:
+                if self.current is None or not self.catch_up():
+                    self.build()
+                self.checked_at = time.monotonic()
+            return self.current
+
+    def build(self):
+        version, synced_at = get_catalog_version(), timezone.now()
+        structure = self.structure(self.rows(is_active=True).iterator(chunk_size=5000))
+        with self.lock:
+            self.current, self.version, self.synced_at = structure, version, synced_at
+
+    def catch_up(self):
+        """Apply rows saved since the last sync; False when a rebuild is needed"""
+        from .models import Product
+
+        version = get_catalog_version()
+        if version == self.version:
+            return True
+        synced_at = timezone.now()
+        limit = getattr(settings, 'SNAPSHOT_REBUILD_ROWS', DEFAULT_REBUILD_ROWS)
+        changed = list(self.rows('is_active', updated_at__gte=self.synced_at - SYNC_OVERLAP)[:limit + 1])
+        if len(changed) > limit:
+            return False
+        active = Product.objects.filter(is_active=True).count()
+        added = [(pk, *values) for pk, *values, is_active in changed if is_active]
+        removed = [pk for pk, *values, is_active in changed if not is_active]
+        with self.lock:
+            if hasattr(self.current, 'update'):
+                self.current.update(added, removed)
+            else:
+                for row in added:
+                    self.current.add(*row)
+                for pk in removed:
+                    self.current.remove(pk)
+            self.version, self.synced_at = version, synced_at
+            return len(self.current) == active
+
+    def apply(self, pk, product=None):
+        with self.lock:
+            if self.current is None:
+                return
+            if product is not None and product.is_active:
+                self.current.add(pk, *(getattr(product, field) for field in self.fields))
+            else:
+                self.current.remove(pk)
+
+
+def product_saved(product):
+    """Refresh one product in every snapshot this process has built"""
+    for snapshot in _snapshots:
+        if snapshot.current is not None:
+            # A rolled-back save must not show up in a snapshot
+            transaction.on_commit(lambda snapshot=snapshot: snapshot.apply(product.pk, product))
+
+
+def product_deleted(product_id):
+    for snapshot in _snapshots:
+        if snapshot.current is not None:
+            transaction.on_commit(lambda snapshot=snapshot: snapshot.apply(product_id))
+
+
+def warm_snapshots():
+    """Build every registered snapshot now, e.g. before forking workers"""
+    for snapshot in _snapshots:
+        snapshot.get()
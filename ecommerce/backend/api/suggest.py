@@ -0,0 +1,195 @@
+"""
+In-memory prefix index for product name suggestions
+
+Every word start of every active product name is a key (the rest of the name
+from that word on, normalized like search queries), kept in one sorted list,
+so the products for a prefix are a bisect away and a multi-word prefix such as
+"wireless he" still matches. Results are ranked: names that start with the
+prefix first, then by reviews_count, then by the shorter name. Rank and
+product id are packed into one int per key, so ranking the matches of even a
+one-letter prefix is a heap selection over ints.
+
+Each process keeps its index current as a LiveSnapshot (see snapshots.py),
+checking for writes from other processes every SUGGEST_INDEX_TTL seconds.
+"""
+import heapq
+from bisect import bisect_left
+from itertools import chain
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+from .search import tokenize
+from .snapshots import LiveSnapshot
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+# Short prefixes span many keys; their results are kept until the index changes
+MEMO_PREFIX_LENGTH = 2
+
+# Each key points at an int that sorts in rank order and ends in the product id,
+# so ranking a prefix's matches is a plain nsmallest over ints
+ID_BITS = 40
+ID_MASK = (1 << ID_BITS) - 1
+LATER_WORD = 1 << (ID_BITS + 40)
+MAX_REVIEWS = (1 << 30) - 1
+# Fewer changes than this are cheaper to insert one by one than to rewrite the lists for
+SPLICE_CHANGES = 50
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+def word_keys(name):
+    """The normalized name from each word start on, whole name first"""
+    words = tokenize(name)
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+def rank_code(pk, name, reviews_count):
+    popularity = MAX_REVIEWS - min(max(reviews_count, 0), MAX_REVIEWS)
+    return ((popularity << 10 | min(len(name), 1023)) << ID_BITS) | pk
+
+
+class SuggestIndex:
+    """Sorted word-start keys, each with the rank code of its product"""
+
+    def __init__(self, rows):
+        self.products = {}  # product id -> (name, slug, rank code)
+        pairs = []
+        for pk, name, slug, reviews_count in rows:
+            code = rank_code(pk, name, reviews_count)
+            self.products[pk] = (name, slug, code)
+            pairs.extend(self.entries(name, code))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.codes = [code for _, code in pairs]
+        self.memo = {}
+
+    def __len__(self):
+        return len(self.products)
+
+    @staticmethod
+    def entries(name, code):
+        keys = word_keys(name)
+        return [(key, code if i == 0 else code | LATER_WORD) for i, key in enumerate(keys)]
+
+    def add(self, pk, name, slug, reviews_count):
+        self.remove(pk)
+        code = rank_code(pk, name, reviews_count)
+        self.products[pk] = (name, slug, code)
+        for key, entry_code in self.entries(name, code):
+            position = bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+            self.codes.insert(position, entry_code)
+        self.memo.clear()
+
+    def remove(self, pk):
+        entry = self.products.pop(pk, None)
+        if entry is None:
+            return
+        # Last first, so deleting one does not move the others
+        for position in sorted(self.positions(pk, entry), reverse=True):
+            del self.keys[position]
+            del self.codes[position]
+        self.memo.clear()
+
+    def update(self, rows, removed=()):
+        """
+        add() every (pk, name, slug, reviews_count) row and remove() every pk in
+        `removed`, rewriting the key lists once instead of shifting them per key
+        """
+        if len(rows) + len(removed) <= SPLICE_CHANGES:
+            for row in rows:
+                self.add(*row)
+            for pk in removed:
+                self.remove(pk)
+            return
+        # Positions (in the current lists) of the keys to drop and of the keys to insert
+        events = []
+        for pk in chain(removed, (row[0] for row in rows)):
+            entry = self.products.pop(pk, None)
+            if entry is not None:
+                events.extend((position, 1, None, None) for position in self.positions(pk, entry))
+        for pk, name, slug, reviews_count in rows:
+            code = rank_code(pk, name, reviews_count)
+            self.products[pk] = (name, slug, code)
+            events.extend((bisect_left(self.keys, key), 0, key, entry_code)
+                          for key, entry_code in self.entries(name, code))
+        if not events:
+            return
+        # Inserts at a position go before the old key there (which may be dropped), in key order
+        events.sort(key=lambda event: (event[0], event[1], event[2] or ''))
+        keys, codes, start = [], [], 0
+        for position, drop, key, code in events:
+            keys.extend(self.keys[start:position])
+            codes.extend(self.codes[start:position])
+            if drop:
+                start = position + 1
+            else:
+                start = position
+                keys.append(key)
+                codes.append(code)
+        keys.extend(self.keys[start:])
+        codes.extend(self.codes[start:])
+        self.keys, self.codes = keys, codes
+        self.memo.clear()
+
+    def positions(self, pk, entry):
+        """Where the keys of product `pk` (its products entry) are in the key lists"""
+        for key, _ in self.entries(entry[0], entry[2]):
+            position = bisect_left(self.keys, key)
+            while self.codes[position] & ID_MASK != pk:
+                position += 1
+            yield position
+
+    def lookup(self, prefix, limit=DEFAULT_LIMIT):
+        """Up to `limit` {name, slug} suggestions for a raw user prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        memoize = len(prefix) <= MEMO_PREFIX_LENGTH
+        if memoize and (prefix, limit) in self.memo:
+            return self.memo[prefix, limit]
+
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff', start)
+        result, seen = [], set()
+        # A name can match at more than one word; take spares and keep each product once
+        for code in heapq.nsmallest(limit * 2, self.codes[start:end]):
+            pk = code & ID_MASK
+            if pk not in seen:
+                seen.add(pk)
+                name, slug, _ = self.products[pk]
+                result.append({'name': name, 'slug': slug})
+                if len(result) == limit:
+                    break
+        if memoize:
+            self.memo[prefix, limit] = result
+        return result
+
+
+def parse_limit(value):
+    """The ?limit= parameter, clamped to 1..MAX_LIMIT"""
+    try:
+        return max(1, min(int(value), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def suggestion_response(response):
+    # Type-ahead repeats prefixes (backspace, retyping); let the browser keep them briefly
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'SUGGEST_MAX_AGE', 60))
+    return response
+
+
+suggestions = LiveSnapshot(SuggestIndex, ('name', 'slug', 'reviews_count'), 'SUGGEST_INDEX_TTL')
+
+
+def suggest(prefix, limit=DEFAULT_LIMIT, index=None):
+    """Suggestions from `index`, or from this process's index (built or caught up as needed)"""
+    if index is None:
+        index = suggestions.get()
+    with suggestions.lock:
+        return index.lookup(prefix, limit)
@@ -0,0 +1,311 @@
+"""
+Deterministic synthetic data at production scale
+
+Every table is generated from its own RNG derived from one seed, so the same
+seed and sizes always give the same rows, and resizing one table leaves the
+others unchanged. Rows are built and inserted in chunks with bulk_create;
+only ids and prices of products, users' ids and their default addresses are
+kept in memory (compact arrays), so memory stays bounded at millions of rows.
+
+Distributions aim at what a shop looks like rather than uniform noise:
+category sizes and product/customer popularity are skewed, prices are
+log-normal, ratings cluster around 4.2 and most timestamps are recent.
+"""
+import math
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.text import slugify
+
+from .models import Category, Product, Address, CartItem, Order, OrderItem
+
+CATEGORY_NAMES = [
+    'Electronics', 'Clothing', 'Home & Garden', 'Sports', 'Books', 'Toys & Games',
+    'Beauty & Health', 'Automotive', 'Grocery', 'Pet Supplies', 'Office', 'Music',
+]
+ADJECTIVES = [
+    'Wireless', 'Smart', 'Classic', 'Premium', 'Compact', 'Portable', 'Organic', 'Ergonomic',
+    'Deluxe', 'Ultra', 'Eco', 'Vintage', 'Modern', 'Heavy-Duty', 'Lightweight', 'Pro',
+]
+NOUNS = [
+    'Headphones', 'Watch', 'Stand', 'T-Shirt', 'Shoes', 'Tool Set', 'Notebook', 'Board Game',
+    'Lamp', 'Backpack', 'Speaker', 'Bottle', 'Jacket', 'Chair', 'Camera', 'Blender',
+    'Keyboard', 'Mug', 'Tent', 'Charger',
+]
+FEATURES = [
+    'long battery life', 'a two-year warranty', 'recycled materials', 'a slim profile',
+    'fast charging', 'a water-resistant finish', 'easy assembly', 'a lifetime guarantee',
+]
+CITIES = ['Kuwait City', 'Hawalli', 'Salmiya', 'Farwaniya', 'Jahra', 'Ahmadi', 'Mubarak Al-Kabeer']
+PAYMENT_METHODS = ['card', 'card', 'card', 'cash', 'knet']
+DISCOUNTS = [5, 10, 15, 20, 25, 30, 40, 50]
+
+HISTORY = timedelta(days=730)
+SAMPLE_PASSWORD = 'password123'
+
+
+def product_name(index):
+    """Pure function of the index, so order items can name products without storing them"""
+    adjective = ADJECTIVES[index % len(ADJECTIVES)]
+    noun = NOUNS[(index // len(ADJECTIVES)) % len(NOUNS)]
+    return f'{adjective} {noun} {index + 1}'
+
+
+def skewed_index(rng, size, exponent=2.5):
+    """Index in [0, size) with low indexes far more likely (popular items/customers)"""
+    return min(size - 1, int(size * rng.random() ** exponent))
+
+
+def scatter(size):
+    """Fixed permutation of range(size) so popular rows are spread across the table"""
+    step = 2654435761 % size or 1
+    while math.gcd(step, size) != 1:
+        step += 1
+    return lambda index: (index * step) % size
+
+
+def recent_age(rng):
+    """Age within HISTORY, skewed towards recent"""
+    return HISTORY * rng.random() ** 2
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create store the generated created_at/updated_at values"""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Progress:
+    """Prints rows done and rows/second at most once a second per table"""
+
+    def __init__(self, write):
+        self.write = write
+        self.summary = []
+
+    def start(self, label, total):
+        self.label, self.total, self.done = label, total, 0
+        self.started = self.last_report = time.perf_counter()
+
+    def advance(self, rows):
+        self.done += rows
+        now = time.perf_counter()
+        if now - self.last_report >= 1 and self.done < self.total:
+            self.last_report = now
+            self.write(f'  {self.label}: {self.done:,}/{self.total:,} '
+                       f'({self.done * 100 // max(self.total, 1)}%) {self.rate(now):,.0f} rows/s')
+
+    def finish(self):
+        now = time.perf_counter()
+        self.summary.append((self.label, self.done, now - self.started))
+        self.write(f'  {self.label}: {self.done:,} rows in {now - self.started:.1f}s '
+                   f'({self.rate(now):,.0f} rows/s)')
+
+    def rate(self, now):
+        return self.done / max(now - self.started, 1e-9)
+
+
+class SyntheticDataset:
+    def __init__(self, seed, end, chunk_size, progress):
+        self.seed = seed
+        self.end = end
+        self.chunk_size = chunk_size
+        self.progress = progress
+
+    def rng(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+    def insert(self, model, label, rows, total, keep_ids=False):
+        """bulk_create `rows` chunk by chunk; optionally return the new pks in order"""
+        ids = array('q') if keep_ids else None
+        self.progress.start(label, total)
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.chunk_size)):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            if keep_ids:
+                ids.extend(obj.pk for obj in chunk)
+            self.progress.advance(len(chunk))
+        self.progress.finish()
+        return ids
+
+    def generate(self, categories, products, users, orders, cart_share=0.25):
+        with explicit_timestamps(Category, Product, Address, CartItem, Order):
+            category_ids = self.categories(categories)
+            product_ids, product_cents = self.products(products, category_ids)
+            user_ids = self.users(users)
+            default_addresses = self.addresses(user_ids)
+            self.cart_items(user_ids, product_ids, cart_share)
+            self.orders(orders, user_ids, default_addresses, product_ids, product_cents)
+        return self.progress.summary
+
+    def categories(self, count):
+        def rows():
+            for i in range(count):
+                base = CATEGORY_NAMES[i % len(CATEGORY_NAMES)]
+                name = f'{base} {i // len(CATEGORY_NAMES) + 1}'
+                created = self.end - HISTORY
+                yield Category(name=name, slug=slugify(name), description=f'{base} and related products',
+                               created_at=created, updated_at=created)
+        return self.insert(Category, 'categories', rows(), count, keep_ids=True)
+
+    def products(self, count, category_ids):
+        rng = self.rng('products')
+        # Category sizes follow a Zipf-like curve: a few big categories, a long tail
+        cum_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(category_ids))))
+        cents = array('l')
+
+        def rows():
+            for i in range(count):
+                price = min(500000, max(99, int(math.exp(rng.gauss(math.log(3000), 0.9))) // 100 * 100 + 99))
+                original_price, discount = None, 0
+                if rng.random() < 0.3:
+                    discount = rng.choice(DISCOUNTS)
+                    original_price = Decimal(int(price / (1 - discount / 100))) / 100
+                cents.append(price)
+                created = self.end - recent_age(rng)
+                name = product_name(i)
+                yield Product(
+                    name=name,
+                    slug=slugify(name),
+                    description=f'{name} with {rng.choice(FEATURES)} and {rng.choice(FEATURES)}.',
+                    price=Decimal(price) / 100,
+                    original_price=original_price,
+                    discount=discount,
+                    category_id=rng.choices(category_ids, cum_weights=cum_weights)[0],
+                    stock=0 if rng.random() < 0.06 else int(rng.expovariate(1 / 60)),
+                    rating=Decimal(f'{min(5.0, max(1.0, rng.gauss(4.2, 0.45))):.2f}'),
+                    reviews_count=min(20000, int(rng.paretovariate(1.2)) - 1),
+                    is_active=rng.random() < 0.97,
+                    created_at=created,
+                    updated_at=created,
+                )
+        ids = self.insert(Product, 'products', rows(), count, keep_ids=True)
+        return ids, cents
+
+    def users(self, count):
+        rng = self.rng('users')
+        # Hashing once keeps millions of users fast; every sample user shares the password
+        password = make_password(SAMPLE_PASSWORD)
+
+        def rows():
+            for i in range(count):
+                username = f'shopper{i + 1:07d}'
+                yield User(username=username, email=f'{username}@example.com', password=password,
+                           first_name='Shopper', last_name=f'{i + 1}', date_joined=self.end - recent_age(rng))
+        return self.insert(User, 'users', rows(), count, keep_ids=True)
+
+    def addresses(self, user_ids):
+        rng = self.rng('addresses')
+        # 60% of shoppers keep one address, the rest two or three
+        counts = array('b', (1 if rng.random() < 0.6 else 2 if rng.random() < 0.75 else 3 for _ in user_ids))
+
+        def rows():
+            for user_id, count in zip(user_ids, counts):
+                for n in range(count):
+                    created = self.end - recent_age(rng)
+                    yield Address(
+                        user_id=user_id, full_name=f'Shopper {user_id}', phone=f'+965{rng.randrange(10**7, 10**8)}',
+                        address=f'Block {rng.randint(1, 12)}, Street {rng.randint(1, 200)}',
+                        city=rng.choice(CITIES), state='Kuwait', zip_code=f'{rng.randint(10000, 99999)}',
+                        address_type='home' if n == 0 else rng.choice(['work', 'other']), is_default=n == 0,
+                        lat=Decimal(f'{29.3 + rng.uniform(-0.3, 0.3):.6f}'),
+                        lng=Decimal(f'{47.9 + rng.uniform(-0.3, 0.3):.6f}'),
+                        created_at=created, updated_at=created,
+                    )
+        ids = self.insert(Address, 'addresses', rows(), sum(counts), keep_ids=True)
+
+        # Each user's first address is the default; orders deliver there
+        defaults, position = array('q'), 0
+        for count in counts:
+            defaults.append(ids[position])
+            position += count
+        return defaults
+
+    def cart_items(self, user_ids, product_ids, share):
+        rng = self.rng('cart_items')
+        pick = scatter(len(product_ids))
+        counts = array('b', (
+            min(8, 1 + int(rng.expovariate(1 / 1.5))) if rng.random() < share else 0 for _ in user_ids
+        ))
+
+        def rows():
+            for user_id, count in zip(user_ids, counts):
+                products = set()
+                while len(products) < min(count, len(product_ids)):
+                    products.add(product_ids[pick(skewed_index(rng, len(product_ids)))])
+                created = self.end - timedelta(days=rng.random() * 14)
+                for product_id in products:
+                    yield CartItem(user_id=user_id, product_id=product_id, quantity=rng.randint(1, 3),
+                                   created_at=created, updated_at=created)
+        self.insert(CartItem, 'cart items', rows(), sum(min(c, len(product_ids)) for c in counts))
+
+    def orders(self, count, user_ids, default_addresses, product_ids, product_cents):
+        rng = self.rng('orders')
+        pick_product = scatter(len(product_ids))
+        pick_user = scatter(len(user_ids))
+        self.progress.start('orders + items', count)
+        produced = 0
+
+        while produced < count:
+            orders, items = [], []
+            for i in range(produced, min(count, produced + self.chunk_size)):
+                user = pick_user(skewed_index(rng, len(user_ids), exponent=1.8))
+                age = recent_age(rng)
+                lines = {}
+                for _ in range(1 + min(9, int(rng.expovariate(1 / 1.2)))):
+                    index = pick_product(skewed_index(rng, len(product_ids)))
+                    lines[index] = lines.get(index, 0) + rng.randint(1, 2)
+                order_items = [
+                    OrderItem(product_id=product_ids[index], product_name=product_name(index), quantity=quantity,
+                              price=Decimal(product_cents[index]) / 100,
+                              total=Decimal(product_cents[index] * quantity) / 100)
+                    for index, quantity in lines.items()
+                ]
+                subtotal = sum(item.total for item in order_items)
+                shipping = Decimal('0.00') if subtotal >= 50 else Decimal('5.00')
+                created = self.end - age
+                orders.append(Order(
+                    user_id=user_ids[user], order_number=f'ORD-SYN-{i + 1:09d}',
+                    delivery_address_id=default_addresses[user], status=self.order_status(rng, age),
+                    subtotal=subtotal, shipping_cost=shipping, total=subtotal + shipping,
+                    payment_method=rng.choice(PAYMENT_METHODS), created_at=created,
+                    updated_at=created + min(age, timedelta(days=rng.randint(0, 10))),
+                ))
+                items.append(order_items)
+
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                for order, order_items in zip(orders, items):
+                    for item in order_items:
+                        item.order_id = order.pk
+                OrderItem.objects.bulk_create([item for order_items in items for item in order_items])
+            produced += len(orders)
+            self.progress.advance(len(orders))
+        self.progress.finish()
+
+    @staticmethod
+    def order_status(rng, age):
+        if age < timedelta(days=2):
+            return rng.choice(['pending', 'processing'])
+        if age < timedelta(days=7):
+            return rng.choice(['processing', 'shipped', 'shipped'])
+        return 'cancelled' if rng.random() < 0.08 else 'delivered'
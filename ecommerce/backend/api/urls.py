@@ -1,7 +1,8 @@
 """
 API URL Configuration
 """
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
@@ -23,18 +24,31 @@ urlpatterns = [
     path('auth/user/', views.get_user, name='get_user'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
+    # Staff exports, e.g. exports/orders.csv?created_after=2026-01-01&status=delivered
+    path('exports/<slug:dataset>.<slug:export_format>', views.export_data, name='export-data'),
+
+    # Catalog cache
+    path('catalog/cache-stats/', views.catalog_cache_stats, name='catalog-cache-stats'),
+
     # Product search
     path('products/search/', views.ProductViewSet.as_view({'get': 'search'}), name='product-search'),
+    path('products/suggest/', views.ProductViewSet.as_view({'get': 'suggest'}), name='product-suggest'),
 ]
 
-
-
-
-
-
-
-
-
-
-
-
+if settings.ASYNC_VIEWS:
+    # Async versions of the read-heavy GET routes (see async_views.py). Only imported
+    # when enabled: the module is costly to import and WSGI workers never use it.
+    from . import async_views
+
+    async_urlpatterns = [
+        path('products/', async_views.product_list),
+        path('products/search/', async_views.product_search),
+        path('products/suggest/', async_views.product_suggest),
+        re_path(r'^products/(?P<slug>[^/.]+)/$', async_views.product_detail),
+        path('categories/', async_views.category_list),
+        re_path(r'^categories/(?P<slug>[^/.]+)/$', async_views.category_detail),
+        re_path(r'^categories/(?P<slug>[^/.]+)/products/$', async_views.category_products),
+        path('auth/user/', async_views.get_user),
+    ]
+    # Matched before the router; other methods and routes fall through to the sync views
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -3,42 +3,104 @@ API Views for handling HTTP requests
 """
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
+from .authentication import ClaimsRefreshToken
+from .cache import cache_catalog_response, get_stats as get_catalog_cache_stats
+from .cart import apply_cart_operations
+from .checkout import place_order, CheckoutError
+from .conditional import conditional_get, CatalogValidatorsMixin, OwnedValidatorsMixin
+from .exports import DATASETS as EXPORT_DATASETS, FORMATS as EXPORT_FORMATS, ExportError, async_chunks, stream_export
+from .facets import facet_counts, wants_facets
+from .fieldsets import SparseFieldsViewMixin, field_plan
+from .filters import ProductFacetFilter, ProductSearchFilter
+from .idempotency import idempotent
 from .models import Category, Product, Address, CartItem, Order, OrderItem
 from .serializers import (
     CategorySerializer, ProductSerializer, UserSerializer, RegisterSerializer,
-    AddressSerializer, CartItemSerializer, OrderSerializer, OrderItemSerializer
+    AddressSerializer, CartItemSerializer, OrderSerializer, OrderItemSerializer,
+    CartBatchSerializer, CatalogRowSerializer
 )
+from .search import get_search_backend
+from .suggest import parse_limit, suggest, suggestion_response
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(SparseFieldsViewMixin, CatalogValidatorsMixin, viewsets.ReadOnlyModelViewSet):
     """Category ViewSet - Read only"""
+    replica_reads = True
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     lookup_field = 'slug'
+    # list and products read .values() rows with the columns CatalogRowSerializer asks for
+    sparse_actions = ('retrieve',)
+
+    @conditional_get
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.category_columns())
+        page = self.paginate_queryset(queryset)
+        data = serializer.category_list(page if page is not None else queryset)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @conditional_get
+    @cache_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=['get'])
+    @conditional_get
+    @cache_catalog_response
     def products(self, request, slug=None):
         """Get products for a category"""
         category = self.get_object()
-        products = Product.objects.filter(category=category, is_active=True)
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        # No request in context here, matching the original ProductSerializer call
+        serializer = CatalogRowSerializer(plan=field_plan(request))
+        products = Product.objects.filter(
+            category=category, is_active=True
+        ).values(*serializer.product_columns())
+        return Response(serializer.products(products))
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(SparseFieldsViewMixin, CatalogValidatorsMixin, viewsets.ReadOnlyModelViewSet):
     """Product ViewSet - Read only for now"""
-    queryset = Product.objects.filter(is_active=True)
+    replica_reads = True
+    queryset = Product.objects.filter(is_active=True).select_related('category')
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [ProductSearchFilter, ProductFacetFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['price', 'name', 'created_at', 'discount']
     ordering = ['-created_at']
     lookup_field = 'slug'
+    # list and search read .values() rows with the columns CatalogRowSerializer asks for
+    sparse_actions = ('retrieve',)
+
+    @conditional_get
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        # Cursor pages are keyed on the sort values, so those columns are read even if not sent
+        columns = serializer.product_columns(*self.ordering_fields)
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(queryset)
+        data = serializer.products(page if page is not None else queryset)
+        if page is None:
+            return Response(data)
+        response = self.get_paginated_response(data)
+        if wants_facets(request):
+            response.data['facets'] = facet_counts(request)
+        return response
+
+    @conditional_get
+    @cache_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -48,32 +110,63 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
     @action(detail=False, methods=['get'])
+    @conditional_get
     def search(self, request):
-        """Search products"""
-        query = request.query_params.get('q', '')
-        if query:
-            products = self.queryset.filter(
-                Q(name__icontains=query) | Q(description__icontains=query)
-            )
-            serializer = self.get_serializer(products, many=True)
-            return Response(serializer.data)
-        return Response([])
+        """Search products, best matches first"""
+        params = request.query_params
+        # get_queryset narrows by ?category; rank within it so the count and pages match
+        # the rows hydrated below. A blank query has no hits and gives an empty page.
+        scope = self.get_queryset() if params.get('category') else None
+        results = get_search_backend().results(params.get('q', ''), scope)
+        page = self.paginate_queryset(results)
+        product_ids = page if page is not None else results[:]
+
+        # Hydrate the ranked page in one query and restore the ranking order
+        serializer = CatalogRowSerializer(request, field_plan(request))
+        rows = self.get_queryset().filter(pk__in=product_ids).values(*serializer.product_columns())
+        by_id = {row['id']: row for row in rows}
+        data = serializer.products(by_id[pk] for pk in product_ids if pk in by_id)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Product names and slugs for a type-ahead prefix, from the in-memory index"""
+        params = request.query_params
+        return suggestion_response(Response(suggest(params.get('q', ''), parse_limit(params.get('limit')))))
+
+
+def registration_response(user):
+    refresh = ClaimsRefreshToken.for_user(user)
+    return Response({
+        'user': UserSerializer(user).data,
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'token': str(refresh.access_token)  # Also include 'token' for compatibility
+    }, status=status.HTTP_201_CREATED)
+
+
+def store_registration(response):
+    return {'user_id': response.data['user']['id']}
+
+
+def replay_registration(stored):
+    # Tokens are never stored; a replay gets fresh ones for the registered user
+    user = User.objects.filter(pk=stored['user_id'], is_active=True).first()
+    if user is None:
+        raise NotFound('The registered account no longer exists')
+    return registration_response(user)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent(store=store_registration, replay=replay_registration)
 def register(request):
     """User Registration"""
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
-        refresh = RefreshToken.for_user(user)
-        return Response({
-            'user': UserSerializer(user).data,
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
-            'token': str(refresh.access_token)  # Also include 'token' for compatibility
-        }, status=status.HTTP_201_CREATED)
+        return registration_response(serializer.save())
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -94,7 +187,7 @@ def login(request):
     
     user = authenticate(username=username, password=password)
     if user:
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'token': str(refresh.access_token),
@@ -115,7 +208,39 @@ def get_user(request):
     return Response(serializer.data)
 
 
-class AddressViewSet(viewsets.ModelViewSet):
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def catalog_cache_stats(request):
+    """Catalog cache version and this worker's hit/miss counters"""
+    return Response(get_catalog_cache_stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_data(request, dataset, export_format):
+    """Stream products, orders or order items as CSV or NDJSON"""
+    if dataset not in EXPORT_DATASETS or export_format not in EXPORT_FORMATS:
+        raise Http404
+    params = request.query_params
+    try:
+        stream = stream_export(
+            dataset, export_format,
+            created_after=params.get('created_after'),
+            created_before=params.get('created_before'),
+            status=params.get('status'),
+            category=params.get('category'),
+        )
+    except ExportError as error:
+        return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if isinstance(request._request, ASGIRequest):
+        stream = async_chunks(stream)
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{export_format}"'
+    return response
+
+
+class AddressViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """Address ViewSet"""
     serializer_class = AddressSerializer
     permission_classes = [IsAuthenticated]
@@ -127,13 +252,28 @@ class AddressViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class CartItemViewSet(viewsets.ModelViewSet):
+class CartItemViewSet(SparseFieldsViewMixin, OwnedValidatorsMixin, viewsets.ModelViewSet):
     """Cart Item ViewSet"""
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
+    validator_includes_catalog = True
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def get_queryset(self):
-        return CartItem.objects.filter(user=self.request.user)
+        return CartItem.objects.filter(
+            user=self.request.user
+        ).select_related('product__category')
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         cart_item, created = CartItem.objects.get_or_create(
@@ -148,63 +288,64 @@ class CartItemViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def total(self, request):
         """Get cart total"""
-        cart_items = self.get_queryset()
+        cart_items = list(self.get_queryset())
         total = sum(item.total_price for item in cart_items)
-        return Response({'total': total, 'count': cart_items.count()})
+        return Response({'total': total, 'count': len(cart_items)})
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def batch(self, request):
+        """Apply add/set/remove/clear operations in one transaction"""
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        skipped = apply_cart_operations(request.user, serializer.validated_data['operations'])
+
+        cart_items = list(self.get_queryset())
+        return Response({
+            'items': self.get_serializer(cart_items, many=True).data,
+            'total': sum(item.total_price for item in cart_items),
+            'count': len(cart_items),
+            'skipped': skipped,
+        })
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsViewMixin, OwnedValidatorsMixin, viewsets.ModelViewSet):
     """Order ViewSet"""
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    validator_related_fields = ('delivery_address__updated_at',)
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(
+            user=self.request.user
+        ).select_related('delivery_address').prefetch_related('items')
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def create_order(self, request):
         """Create order from cart"""
-        from decimal import Decimal
-        
-        cart_items = CartItem.objects.filter(user=request.user)
-        if not cart_items.exists():
-            return Response(
-                {'error': 'Cart is empty'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Calculate totals
-        subtotal = sum(item.total_price for item in cart_items)
-        shipping_cost = Decimal(request.data.get('shipping_cost', 0))
-        discount = Decimal(request.data.get('discount', 0))
-        total = subtotal + shipping_cost - discount
-
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            delivery_address_id=request.data.get('delivery_address_id'),
-            subtotal=subtotal,
-            shipping_cost=shipping_cost,
-            discount=discount,
-            total=total,
-            payment_method=request.data.get('payment_method', ''),
-            notes=request.data.get('notes', '')
-        )
-
-        # Create order items
-        for cart_item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                product_name=cart_item.product.name,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price,
-                total=cart_item.total_price
+        try:
+            order = place_order(
+                request.user,
+                delivery_address_id=request.data.get('delivery_address_id'),
+                shipping_cost=request.data.get('shipping_cost', 0),
+                discount=request.data.get('discount', 0),
+                payment_method=request.data.get('payment_method', ''),
+                notes=request.data.get('notes', '')
             )
+        except CheckoutError as error:
+            body = {'error': str(error)}
+            if error.products:
+                body['products'] = error.products
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
 
-        # Clear cart
-        cart_items.delete()
-
-        serializer = self.get_serializer(order)
+        serializer = self.get_serializer(self.get_queryset().get(pk=order.pk))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
-
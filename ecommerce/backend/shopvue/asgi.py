@@ -0,0 +1,16 @@
+"""
+ASGI config for shopvue project.
+
+Run with e.g. `gunicorn shopvue.asgi:application -k uvicorn.workers.UvicornWorker`
+or `uvicorn shopvue.asgi:application`. Catalog, search and current-user reads
+are served by the async views (see ASYNC_VIEWS in settings.py).
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shopvue.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'true')
+
+application = get_asgi_application()
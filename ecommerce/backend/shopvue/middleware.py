@@ -0,0 +1,113 @@
+"""
+Project middleware
+"""
+import os
+import stat
+from urllib.parse import urlparse
+from wsgiref.headers import Headers
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+from whitenoise.responders import StaticFile
+from whitenoise.string_utils import ensure_leading_trailing_slash
+
+from api.media import is_hashed
+
+# Media files whose headers are kept between requests, per process
+MEDIA_FILE_CACHE_SIZE = 4096
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise that also serves MEDIA_ROOT and runs natively under ASGI.
+
+    Uploads appear at runtime, so media is looked up per request (one stat)
+    rather than scanned at startup. It is answered here, before sessions,
+    authentication and the database, with WhiteNoise's ETag/If-None-Match,
+    Range and file responses (sendfile under gunicorn). Content-hashed names
+    (see api/media.py) are cached forever; other media for MEDIA_MAX_AGE.
+
+    WhiteNoise 6.6 is sync-only, and a sync middleware at the top of the stack
+    makes Django push every ASGI request through one shared thread. Lookups
+    are in memory, so only file system access goes to a worker thread.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.media_root = os.path.abspath(settings.MEDIA_ROOT) if settings.MEDIA_ROOT else None
+        media_url = urlparse(settings.MEDIA_URL or '')
+        # A MEDIA_URL on another host (a CDN, object storage) is not ours to serve
+        if not getattr(settings, 'SERVE_MEDIA', True) or media_url.netloc or not self.media_root:
+            self.media_prefix = None
+        else:
+            self.media_prefix = ensure_leading_trailing_slash(media_url.path)
+        self.media_max_age = getattr(settings, 'MEDIA_MAX_AGE', self.max_age)
+        self.media_files = {}
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.is_media(request.path_info):
+            media_file = self.find_media_file(request.path_info)
+            if media_file is not None:
+                return self.serve(media_file, request)
+            return self.get_response(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.is_media(request.path_info):
+            static_file = await sync_to_async(self.find_media_file, thread_sensitive=False)(request.path_info)
+        elif self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+    def is_media(self, url):
+        return self.media_prefix is not None and url.startswith(self.media_prefix)
+
+    def find_media_file(self, url):
+        if not self.url_is_canonical(url):
+            return None
+        path = os.path.join(self.media_root, url[len(self.media_prefix):])
+        if os.path.commonpath((self.media_root, path)) != self.media_root:
+            return None
+        try:
+            stat_result = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        # Reuse the headers until the file changes
+        version = (stat_result.st_mtime_ns, stat_result.st_size)
+        cached = self.media_files.get(url)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        headers = self.media_headers(path, url)
+        # Images are compressed already, so there are no .gz/.br alternatives to look for
+        static_file = StaticFile(path, headers.items(), stat_cache={path: stat_result})
+        if len(self.media_files) >= MEDIA_FILE_CACHE_SIZE:
+            self.media_files.clear()
+        self.media_files[url] = (version, static_file)
+        return static_file
+
+    def media_headers(self, path, url):
+        headers = Headers([])
+        self.add_mime_headers(headers, path, url)
+        if is_hashed(url):
+            headers['Cache-Control'] = f'max-age={self.FOREVER}, public, immutable'
+        elif self.media_max_age is not None:
+            headers['Cache-Control'] = f'max-age={self.media_max_age}, public'
+        if self.allow_all_origins:
+            headers['Access-Control-Allow-Origin'] = '*'
+        # Uploads are user content; never let a browser sniff one into HTML
+        headers['X-Content-Type-Options'] = 'nosniff'
+        return headers
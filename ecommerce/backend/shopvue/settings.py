@@ -4,8 +4,11 @@ Django settings for shopvue project.
 
 from pathlib import Path
 from datetime import timedelta
+from importlib.util import find_spec
 import os
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,7 +46,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'shopvue.middleware.WhiteNoiseMiddleware',
+    'api.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware (must be before CommonMiddleware)
     'django.middleware.common.CommonMiddleware',
@@ -72,18 +76,77 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'shopvue.wsgi.application'
+ASGI_APPLICATION = 'shopvue.asgi.application'
+
+# Serve catalog, search and /api/auth/user/ GETs from api/async_views.py.
+# shopvue/asgi.py turns this on; under WSGI the sync viewsets handle them.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False').lower() in ('true', '1', 'yes')
 
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# shopvue.sqlite_backend is Django's sqlite3 backend plus per-connection PRAGMAs
+# and BEGIN IMMEDIATE for atomic blocks, so several gunicorn workers can share
+# the file: readers never block the writer (WAL), writers queue on busy_timeout.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'shopvue.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 20000,
+                'mmap_size': 268435456,
+                'cache_size': -20000,
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
 
+# Optional read replicas for catalog traffic (see api/replicas.py), e.g. locally:
+#   cp db.sqlite3 db-replica.sqlite3
+#   DATABASE_REPLICAS=db-replica.sqlite3 python manage.py runserver
+# DATABASE_REPLICA_WEIGHTS="3,1" pairs with two replica paths for the weighted strategy.
+
+REPLICA_PATHS = [path for path in os.environ.get('DATABASE_REPLICAS', '').split(',') if path]
+REPLICA_WEIGHTS = [int(weight) for weight in os.environ.get('DATABASE_REPLICA_WEIGHTS', '').split(',') if weight]
+
+DATABASE_REPLICAS = {}
+for index, path in enumerate(REPLICA_PATHS):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': BASE_DIR / path, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS[alias] = REPLICA_WEIGHTS[index] if index < len(REPLICA_WEIGHTS) else 1
+
+DATABASE_REPLICA_STRATEGY = os.environ.get('DATABASE_REPLICA_STRATEGY', 'round_robin')
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+
+# Cache
+# The catalog cache is file based so every gunicorn worker on the machine sees
+# the same catalog version; point it at Redis/Memcached when scaling out.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shopvue-default',
+    },
+    'catalog': {
+        'BACKEND': os.environ.get('CATALOG_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', str(BASE_DIR / 'cache' / 'catalog')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -126,6 +189,17 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads get a content hash in their name, so they can be cached forever (see api/media.py)
+STORAGES = {
+    'default': {'BACKEND': 'api.media.HashedFileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# shopvue.middleware.WhiteNoiseMiddleware serves MEDIA_ROOT; turn off when a proxy or CDN does
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA', 'True').lower() in ('true', '1', 'yes')
+# Browser cache lifetime of media without a content hash in its name
+MEDIA_MAX_AGE = 0 if DEBUG else 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -134,16 +208,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model (optional - using default for simplicity)
 # AUTH_USER_MODEL = 'api.CustomUser'
 
+# orjson-backed JSON with a stdlib fallback (see api/renderers.py); with msgpack
+# installed, clients can also ask for application/msgpack in Accept
+API_RENDERERS = ['api.renderers.JSONRenderer', 'rest_framework.renderers.BrowsableAPIRenderer']
+API_PARSERS = ['api.renderers.JSONParser', 'rest_framework.parsers.FormParser',
+               'rest_framework.parsers.MultiPartParser']
+if find_spec('msgpack') is not None:
+    API_RENDERERS.append('api.renderers.MessagePackRenderer')
+    API_PARSERS.append('api.renderers.MessagePackParser')
+
 # REST Framework settings
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': API_RENDERERS,
+    'DEFAULT_PARSER_CLASSES': API_PARSERS,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.StandardPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
@@ -151,6 +236,37 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Product search (see api/search.py). Unset means FTS5 on SQLite, LIKE elsewhere.
+# PRODUCT_SEARCH_BACKEND = 'api.search.SQLiteFTSBackend'
+
+# Seconds a worker serves /api/products/suggest/ before checking the catalog version (see api/suggest.py)
+SUGGEST_INDEX_TTL = 30
+
+# Seconds a worker counts ?facets=true from its snapshot before checking the catalog version (see api/facets.py)
+FACET_SNAPSHOT_TTL = 30
+
+# Snapshots catching up on more changed products than this rebuild off-lock instead (see api/snapshots.py)
+SNAPSHOT_REBUILD_ROWS = 2000
+
+# Responsive sizes of uploaded Product/Category images (see api/images.py)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1024)
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+# New uploads are resized in this many background threads per worker after commit
+IMAGE_DERIVATIVE_THREADS = 1
+IMAGE_DERIVATIVES_IN_BACKGROUND = True
+# External image hosts that resize on request (imgix-style w/h/fm parameters)
+IMAGE_RESIZING_HOSTS = ('images.unsplash.com',)
+
+# Seconds a worker trusts a token's user fingerprint and cached profile before re-checking them (see api/authentication.py)
+JWT_USER_CACHE_TTL = 30
+
+# How long a stored Idempotency-Key response can be replayed (see api/idempotency.py)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# `manage.py boot --check-imports` fails (warns with --warn-only, as in the deploy build)
+# when a fresh process spends longer importing the app
+BOOT_IMPORT_BUDGET_MS = int(os.environ.get('BOOT_IMPORT_BUDGET_MS', 1000))
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -169,6 +285,10 @@ CORS_ALLOWED_ORIGINS = [
     "https://localhost",
 ]
 
+# Let browsers send Idempotency-Key and read the replay marker
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
 # Allow all origins for demo (frontend on Netlify, backend on Render)
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
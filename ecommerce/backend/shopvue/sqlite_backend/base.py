@@ -0,0 +1,36 @@
+"""
+SQLite backend tuned for several gunicorn workers sharing one database file
+
+Extra OPTIONS understood on top of Django's sqlite3 backend:
+
+- ``pragmas``: PRAGMA name -> value, applied to every new connection
+  (WAL journaling, synchronous level, mmap and page cache sizes, ...).
+- ``transaction_mode``: ``"IMMEDIATE"`` makes ``transaction.atomic()`` take
+  the write lock up front, so a transaction that reads and then writes
+  can't fail halfway with "database is locked" when another worker commits
+  first. It waits on busy_timeout instead.
+"""
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            mode = 'DEFERRED'
+        self.cursor().execute(f'BEGIN {mode}')